@@ -1,15 +1,13 @@
 import copy
-from collections import deque
-from arc3 import ac3
-
-GAME_SIZE = 9
+from array import array
+from arc3 import AC3
 
 # the MRV
 def select_unassigned_variable(game_state: list[int], domains: list[set[int]]) -> int:
     best_var = -1
     min_size = float('inf')
     
-    for i in range(GAME_SIZE * GAME_SIZE):
+    for i in range(len(game_state)):
         if game_state[i] == 0:
             size = len(domains[i])
             if size < min_size:
@@ -17,6 +15,12 @@ def select_unassigned_variable(game_state: list[int], domains: list[set[int]]) -
                 best_var = i
     return best_var
 
+def _enter_node(stats) -> None:
+    stats.nodes += 1
+    stats.depth += 1
+    if stats.depth > stats.max_depth:
+        stats.max_depth = stats.depth
+
 def is_consistent(var: int, value: int, game_state: list[int], game_constrains: list[list[int]]) -> bool:
     for neighbor in game_constrains[var]:
         if game_state[neighbor] != 0:
@@ -24,7 +28,10 @@ def is_consistent(var: int, value: int, game_state: list[int], game_constrains:
                 return False
     return True
 
-def back_track(game_state: list[int], domains: list[set[int]], game_constrains: list[list[int]]) -> bool:
+def back_track(game_state: list[int], domains: list[set[int]], game_constrains: list[list[int]], engine: AC3 = None, stats=None) -> bool:
+    if engine is None:
+        engine = AC3(game_constrains)
+
     var = select_unassigned_variable(game_state, domains)
     
     if var == -1:
@@ -33,20 +40,122 @@ def back_track(game_state: list[int], domains: list[set[int]], game_constrains:
     for value in sorted(list(domains[var])):
         
         if is_consistent(var, value, game_state, game_constrains): # is it valid
+            if stats is not None:
+                _enter_node(stats)
 
             new_domains = copy.deepcopy(domains)
             new_domains[var] = {value}
             
-            mac_queue = deque()
-            for neighbor in game_constrains[var]:
-                mac_queue.append((neighbor, var))
-            
-            if ac3(game_constrains, new_domains, mac_queue):
+            if engine.propagate(new_domains, (var,), stats): # MAC: arcs into var
                 game_state[var] = value
                 
-                if back_track(game_state, new_domains, game_constrains):
+                if back_track(game_state, new_domains, game_constrains, engine, stats):
                     return True
                 
                 game_state[var] = 0
+
+            if stats is not None:
+                stats.depth -= 1
             
-    return False
\ No newline at end of file
+    if stats is not None:
+        stats.backtracks += 1
+    return False
+
+# Bitmask variant of the MRV
+def select_unassigned_variable_bits(game_state: list[int], domains: array) -> int:
+    best_var = -1
+    min_size = float('inf')
+
+    for i in range(len(game_state)):
+        if game_state[i] == 0:
+            size = domains[i].bit_count()
+            if size < min_size:
+                min_size = size
+                best_var = i
+    return best_var
+
+def back_track_bits(game_state: list[int], domains: array, game_constrains: list[list[int]], engine: AC3 = None, stats=None) -> bool:
+    if engine is None:
+        engine = AC3(game_constrains)
+
+    var = select_unassigned_variable_bits(game_state, domains)
+
+    if var == -1:
+        return True
+
+    remaining = domains[var]
+    while remaining:
+        bit = remaining & -remaining # lowest value first
+        remaining ^= bit
+        value = bit.bit_length()
+
+        if is_consistent(var, value, game_state, game_constrains): # is it valid
+            if stats is not None:
+                _enter_node(stats)
+
+            new_domains = domains[:] # flat array copy instead of deepcopy
+            new_domains[var] = bit
+
+            if engine.propagate_bits(new_domains, (var,), None, stats):
+                game_state[var] = value
+
+                if back_track_bits(game_state, new_domains, game_constrains, engine, stats):
+                    return True
+
+                game_state[var] = 0
+
+            if stats is not None:
+                stats.depth -= 1
+
+    if stats is not None:
+        stats.backtracks += 1
+    return False
+
+def undo(domains: array, trail: list, mark: int) -> None:
+    """Roll the shared domains back to the trail length `mark`"""
+    while len(trail) > mark:
+        idx, old = trail.pop()
+        domains[idx] = old
+
+# MAC search on a single shared domain array: every change is recorded on the
+# trail and rolled back on backtrack instead of copying the domains per value
+def back_track_trail(game_state: list[int], domains: array, game_constrains: list[list[int]], trail: list = None, engine: AC3 = None, stats=None) -> bool:
+    if trail is None:
+        trail = []
+    if engine is None:
+        engine = AC3(game_constrains)
+
+    var = select_unassigned_variable_bits(game_state, domains)
+
+    if var == -1:
+        return True
+
+    remaining = domains[var]
+    while remaining:
+        bit = remaining & -remaining # lowest value first
+        remaining ^= bit
+        value = bit.bit_length()
+
+        if is_consistent(var, value, game_state, game_constrains): # is it valid
+            if stats is not None:
+                _enter_node(stats)
+
+            mark = len(trail)
+            trail.append((var, domains[var]))
+            domains[var] = bit
+
+            if engine.propagate_bits(domains, (var,), trail, stats):
+                game_state[var] = value
+
+                if back_track_trail(game_state, domains, game_constrains, trail, engine, stats):
+                    return True
+
+                game_state[var] = 0
+
+            if stats is not None:
+                stats.depth -= 1
+            undo(domains, trail, mark)
+
+    if stats is not None:
+        stats.backtracks += 1
+    return False
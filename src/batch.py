@@ -0,0 +1,295 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from itertools import islice
+from typing import NamedTuple
+
+from arc3 import AC3
+from board_io import parse_board, format_board
+from canonical import DedupIndex
+from corpus import CorpusReader, is_corpus
+from grader import Grader
+from solution_cache import SolutionCache
+from inference import ALL_TECHNIQUES
+from make_constrain import box_size_for, constraint_graph
+from numpy_batch import solve_batch
+from solve_puzzle import solve, SOLVED, SOLVERS
+
+# puzzles propagated together by a serial --vectorized run
+VECTOR_BATCH = 256
+
+def iter_puzzles(stream):
+    """Yield (line number, puzzle line) lazily, skipping blank lines and # comments"""
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line_no, line
+
+def iter_corpus(reader: CorpusReader):
+    """Yield (puzzle number, puzzle line) from a binary corpus, numbered from 1 like lines"""
+    for n, line in enumerate(reader.lines(), 1):
+        yield n, line
+
+def skip_duplicates(puzzles, index: DedupIndex, skipped: dict):
+    """Drop puzzles already in the dedup index, or symmetric to an earlier one.
+
+    Adds the new ones to the index and counts the dropped ones in skipped["duplicate"].
+    """
+    for line_no, line in puzzles:
+        try:
+            board = parse_board(line)
+        except ValueError:
+            yield line_no, line # reported as invalid by the solver
+            continue
+        if index.add(board):
+            yield line_no, line
+        else:
+            skipped["duplicate"] = skipped.get("duplicate", 0) + 1
+
+def engine_for(engines: dict, box_size: int) -> AC3:
+    """AC3 engine for one grid geometry, built on first use and kept in `engines`"""
+    engine = engines.get(box_size)
+    if engine is None:
+        engine = engines[box_size] = AC3.from_graph(constraint_graph(box_size))
+    return engine
+
+class BatchOptions(NamedTuple):
+    max_nodes: int = None     # search node budget per puzzle
+    time_limit: float = None  # seconds allowed per puzzle
+    techniques: tuple = None  # propagation beyond AC-3, see inference; None = solve_puzzle.default_techniques
+    solver: str = "csp"       # "csp" or "dlx", see solve_puzzle.SOLVERS
+    grade: bool = False       # also grade each puzzle (label and score columns)
+    cache: str = None         # SQLite file of a SolutionCache shared by runs and workers
+    vectorized: bool = False  # propagate chunks of puzzles together, see numpy_batch
+
+# solution caches of this process by file
+_caches = {}
+
+def cache_for(path: str) -> SolutionCache:
+    cache = _caches.get(path)
+    if cache is None:
+        cache = _caches[path] = SolutionCache(path=path)
+    return cache
+
+def grader_for(graders: dict, box_size: int) -> Grader:
+    """Grader for one grid geometry, built on first use and kept in `graders`"""
+    grader = graders.get(box_size)
+    if grader is None:
+        grader = graders[box_size] = Grader(box_size)
+    return grader
+
+def solve_line(line: str, engines: dict, options: BatchOptions = BatchOptions(), graders: dict = None) -> tuple:
+    """Solve one puzzle line; returns (output board, status, nodes, backtracks, seconds, grade)
+
+    grade is a grader.Grade when options.grade is set, else None.
+    """
+    start = time.perf_counter()
+    board = parse_board(line)
+    box_size = box_size_for(len(board))
+    engine = engine_for(engines, box_size)
+    if options.cache:
+        result = cache_for(options.cache).solve(board, max_nodes=options.max_nodes, time_limit=options.time_limit,
+                                                engine=engine, techniques=options.techniques, solver=options.solver)
+    else:
+        result = solve(board, options.max_nodes, options.time_limit, engine, options.techniques, options.solver)
+    output = format_board(result.solution) if result.status == SOLVED else line
+    grade = None
+    if options.grade:
+        # whatever solving left of the time limit
+        time_limit = None if options.time_limit is None else options.time_limit - (time.perf_counter() - start)
+        grade = grader_for(graders if graders is not None else {}, box_size).grade(board, options.max_nodes, time_limit)
+    return (output, result.status, result.stats.nodes, result.stats.backtracks,
+            time.perf_counter() - start, grade)
+
+def solve_entry(line_no: int, line: str, engines: dict, options: BatchOptions = BatchOptions(),
+                graders: dict = None) -> tuple:
+    """solve_line for one input entry, turning a malformed line into an 'invalid' result"""
+    try:
+        return (line_no,) + solve_line(line, engines, options, graders)
+    except ValueError as e:
+        print(f"line {line_no}: {e}", file=sys.stderr)
+        return line_no, line, "invalid", 0, 0, 0.0, None
+
+def solve_vectorized(entries: list, options: BatchOptions = BatchOptions(), graders: dict = None) -> list:
+    """Result tuples of (line number, line) entries, solved together by numpy_batch.solve_batch.
+
+    Each puzzle is credited with an equal share of its batch's time.
+    """
+    results = [None] * len(entries)
+    groups = {}
+    for i, (line_no, line) in enumerate(entries):
+        try:
+            board = parse_board(line)
+        except ValueError as e:
+            print(f"line {line_no}: {e}", file=sys.stderr)
+            results[i] = (line_no, line, "invalid", 0, 0, 0.0, None)
+            continue
+        groups.setdefault(len(board), []).append((i, board))
+
+    for group in groups.values():
+        start = time.perf_counter()
+        solved = solve_batch([board for _, board in group], options.max_nodes, options.time_limit, options.techniques)
+        seconds = (time.perf_counter() - start) / len(group)
+        for (i, board), result in zip(group, solved):
+            line_no, line = entries[i]
+            grade = None
+            if options.grade:
+                grader = grader_for(graders if graders is not None else {}, box_size_for(len(board)))
+                grade = grader.grade(board, options.max_nodes, options.time_limit)
+            output = format_board(result.solution) if result.status == SOLVED else line
+            results[i] = (line_no, output, result.status, result.stats.nodes, result.stats.backtracks, seconds, grade)
+    return results
+
+def solve_serial(puzzles, options: BatchOptions = BatchOptions()):
+    """Solve (line number, line) pairs in this process, yielding one result tuple per puzzle"""
+    engines = {}
+    graders = {}
+    if options.vectorized:
+        for chunk in chunked(puzzles, VECTOR_BATCH):
+            yield from solve_vectorized(chunk, options, graders)
+        return
+    for line_no, line in puzzles:
+        yield solve_entry(line_no, line, engines, options, graders)
+
+# per-process state of the pool workers, set up once by _init_worker
+_worker = None
+
+def _init_worker(options) -> None:
+    global _worker
+    _worker = ({}, {}, options)
+
+def _solve_chunk(chunk: list) -> list:
+    engines, graders, options = _worker
+    if options.vectorized:
+        return solve_vectorized(chunk, options, graders)
+    results = [solve_entry(line_no, line, engines, options, graders) for line_no, line in chunk]
+    if options.cache: # workers are terminated, not closed
+        cache_for(options.cache).flush()
+    return results
+
+def chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def solve_parallel(puzzles, workers: int = None, chunksize: int = 64, ordered: bool = True,
+                   options: BatchOptions = BatchOptions()):
+    """Solve (line number, line) pairs on a process pool, yielding one result tuple per puzzle.
+
+    Puzzles are sent to the workers in chunks of `chunksize` and at most a few
+    chunks per worker are in flight, so the input is still streamed. Results
+    come back in input order when `ordered`, otherwise as chunks complete.
+    """
+    workers = workers or os.cpu_count() or 1
+    slots = threading.Semaphore(workers * 4)
+    stop = threading.Event()
+
+    def feed():
+        # runs on the pool's task thread; blocks while too many chunks are in flight
+        for chunk in chunked(puzzles, chunksize):
+            slots.acquire()
+            if stop.is_set():
+                return
+            yield chunk
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(options,)) as pool:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        try:
+            for results in mapper(_solve_chunk, feed()):
+                slots.release()
+                yield from results
+        finally:
+            stop.set()
+            slots.release()
+
+def parse_techniques(spec: str) -> tuple | None:
+    """Technique names from 'all', 'none' or a comma list; None if one is unknown"""
+    if spec == "all":
+        return ALL_TECHNIQUES
+    if spec == "none":
+        return ()
+    techniques = tuple(name.strip() for name in spec.split(",") if name.strip())
+    if any(name not in ALL_TECHNIQUES for name in techniques):
+        return None
+    return techniques
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Solve Sudoku puzzles in batch (one puzzle per line, 81 characters for 9x9)")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="puzzle file or binary corpus (see corpus), '-' for stdin (default)")
+    parser.add_argument("--max-nodes", type=int, default=None, help="search node budget per puzzle")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds allowed per puzzle")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="worker processes, 0 = one per CPU (default 1)")
+    parser.add_argument("--chunksize", type=int, default=64, help="puzzles sent to a worker at a time")
+    parser.add_argument("--unordered", action="store_true", help="write results as they complete instead of in input order")
+    parser.add_argument("--techniques", default="auto",
+                        help="propagation beyond AC-3: 'auto' (default: hidden singles from 16x16 up), 'all', 'none' "
+                             f"or a comma list of {','.join(ALL_TECHNIQUES)}")
+    parser.add_argument("--solver", choices=SOLVERS, default="csp",
+                        help="AC-3 + MAC search (default) or Dancing Links exact cover")
+    parser.add_argument("--dedup", metavar="INDEX",
+                        help="skip puzzles already in this SQLite dedup index (up to symmetry) and add the rest")
+    parser.add_argument("--cache", metavar="FILE",
+                        help="SQLite solution cache: reuse solutions of puzzles (or symmetric copies) solved before")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="propagate chunks of puzzles together with NumPy, then search the rest one by one")
+    parser.add_argument("--grade", action="store_true",
+                        help="append the technique-based difficulty label and score of each puzzle")
+    args = parser.parse_args(argv)
+
+    techniques = None if args.techniques == "auto" else parse_techniques(args.techniques)
+    if techniques is None and args.techniques != "auto":
+        parser.error(f"unknown technique in {args.techniques!r}")
+    if args.vectorized and (args.solver != "csp" or args.cache):
+        parser.error("--vectorized runs the csp solver without --cache")
+    options = BatchOptions(args.max_nodes, args.time_limit, techniques, args.solver, args.grade, args.cache,
+                           args.vectorized)
+
+    if args.input == "-":
+        stream = sys.stdin
+    elif is_corpus(args.input):
+        stream = CorpusReader(args.input)
+    else:
+        stream = open(args.input)
+    out = sys.stdout
+    counts = {}
+    skipped = {}
+    index = DedupIndex(args.dedup) if args.dedup else None
+    start = time.perf_counter()
+    try:
+        puzzles = iter_corpus(stream) if isinstance(stream, CorpusReader) else iter_puzzles(stream)
+        if index is not None:
+            puzzles = skip_duplicates(puzzles, index, skipped)
+        if args.workers == 1:
+            results = solve_serial(puzzles, options)
+        else:
+            results = solve_parallel(puzzles, args.workers or None, args.chunksize, not args.unordered, options)
+        for line_no, output, status, nodes, backtracks, seconds, grade in results:
+            counts[status] = counts.get(status, 0) + 1
+            line = f"{output}\t{status}\t{nodes}\t{backtracks}\t{seconds * 1000:.3f}"
+            if options.grade:
+                line += f"\t{grade.label}\t{grade.score}" if grade is not None else "\t-\t-"
+            out.write(line + "\n")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if index is not None:
+            index.close()
+    counts.update(skipped)
+    for cache in _caches.values(): # serial run: the caches of this process
+        metrics = cache.metrics()
+        print(f"cache: {metrics['hits']} hits, {metrics['canonical_hits']} symmetric hits, "
+              f"{metrics['disk_hits']} disk hits, {metrics['misses']} misses", file=sys.stderr)
+        cache.close()
+
+    total = sum(counts.values())
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{k}: {v}" for k, v in sorted(counts.items()))
+    print(f"{total} puzzles in {elapsed:.2f}s ({summary})", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
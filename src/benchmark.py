@@ -0,0 +1,213 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from arc3 import AC3
+from back_track import back_track, back_track_bits, back_track_trail
+from benchmark_puzzles import PUZZLE_SETS
+from bit_domains import make_domains
+from inference import Propagator
+from board_io import parse_board
+from corpus import CorpusReader
+from dlx import DLX
+from make_constrain import constraint_graph
+from search import Search, SOLVED
+from solver_stats import SolveStats
+from sudoku_generator import generate_sudoku
+
+# Each engine solves one board on `graph`, filling in `stats`, and returns
+# (solution or None, AC-3 revisions).
+
+def solve_set_engine(board, graph, stats):
+    game_constrains = graph.peers
+    engine = AC3.from_graph(graph)
+    domains = [{val} if val != 0 else set(range(1, 10)) for val in board]
+    if not engine.propagate(domains, None, stats) or not back_track(board, domains, game_constrains, engine, stats):
+        return None, engine.revisions
+    return board, engine.revisions
+
+def solve_bits_engine(board, graph, stats):
+    game_constrains = graph.peers
+    engine = AC3.from_graph(graph)
+    domains = make_domains(board)
+    if not engine.propagate_bits(domains, None, None, stats) or not back_track_bits(board, domains, game_constrains, engine, stats):
+        return None, engine.revisions
+    return board, engine.revisions
+
+def solve_trail_engine(board, graph, stats):
+    game_constrains = graph.peers
+    engine = AC3.from_graph(graph)
+    domains = make_domains(board)
+    if not engine.propagate_bits(domains, None, None, stats) or not back_track_trail(board, domains, game_constrains, None, engine, stats):
+        return None, engine.revisions
+    return board, engine.revisions
+
+def solve_search_engine(board, graph, stats):
+    search = Search(board, graph.peers, AC3.from_graph(graph), stats)
+    if search.run() != SOLVED:
+        return None, search.engine.revisions
+    return search.solution(), search.engine.revisions
+
+def solve_inference_engine(board, graph, stats):
+    propagator = Propagator(graph)
+    search = Search(board, graph.peers, stats=stats, propagator=propagator)
+    if search.run() != SOLVED:
+        return None, search.engine.revisions
+    return search.solution(), search.engine.revisions
+
+def solve_dlx_engine(board, graph, stats):
+    search = DLX(board, stats)
+    if search.run() != SOLVED:
+        return None, 0
+    return search.solution(), 0
+
+ENGINES = {
+    "set": solve_set_engine,
+    "bits": solve_bits_engine,
+    "trail": solve_trail_engine,
+    "search": solve_search_engine,
+    "inference": solve_inference_engine,
+    "dlx": solve_dlx_engine,
+}
+
+# the set engine needs minutes for the Hardest set, so it only runs when asked for
+DEFAULT_ENGINES = tuple(name for name in ENGINES if name != "set")
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+def bench_solver(engine_name: str, puzzles: list[str], graph, repeat: int = 1) -> dict:
+    solve = ENGINES[engine_name]
+    latencies = []
+    nodes = 0
+    revisions = 0
+    failures = 0
+
+    for _ in range(repeat):
+        for line in puzzles:
+            board = parse_board(line)
+            stats = SolveStats()
+            start = time.perf_counter()
+            solution, puzzle_revisions = solve(board, graph, stats)
+            latencies.append(time.perf_counter() - start)
+            if solution is None:
+                failures += 1
+            nodes += stats.nodes
+            revisions += puzzle_revisions
+
+    # peak memory in a separate pass: tracemalloc slows everything down
+    tracemalloc.start()
+    for line in puzzles:
+        solve(parse_board(line), graph, None)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+    count = len(latencies)
+    return {
+        "puzzles": count,
+        "failures": failures,
+        "puzzles_per_sec": count / total if total else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "nodes": nodes // repeat,
+        "revisions": revisions // repeat,
+        "peak_memory_kb": peak / 1024,
+    }
+
+def bench_generator(difficulty: str, count: int, seed: int, box_size: int = 3) -> dict:
+    random.seed(seed)
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        generate_sudoku(difficulty, box_size)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "puzzles": count,
+        "puzzles_per_sec": count / total if total else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+def format_row(name: str, result: dict) -> str:
+    nodes = "-" if result.get("nodes") is None else str(result["nodes"])
+    revisions = "-" if result.get("revisions") is None else str(result["revisions"])
+    memory = "-" if result.get("peak_memory_kb") is None else f"{result['peak_memory_kb']:.0f}"
+    return (f"{name:<22} {result['puzzles_per_sec']:>9.1f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['p99_ms']:>9.2f} {nodes:>9} {revisions:>10} {memory:>9}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Sudoku solver engines and the generator")
+    parser.add_argument("--engines", default=",".join(DEFAULT_ENGINES),
+                        help=f"comma separated engines out of {','.join(ENGINES)} (default: all but set)")
+    parser.add_argument("--sets", default=",".join(PUZZLE_SETS), help="comma separated puzzle sets (default: all)")
+    parser.add_argument("--corpus", action="append", default=[], metavar="FILE",
+                        help="also benchmark on puzzles of a binary corpus (see corpus); repeatable")
+    parser.add_argument("--limit", type=int, default=1000, help="puzzles taken from each corpus (default 1000)")
+    parser.add_argument("--repeat", type=int, default=1, help="times each puzzle set is solved")
+    parser.add_argument("--generate", type=int, default=3, help="puzzles generated per difficulty, 0 to skip")
+    parser.add_argument("--seed", type=int, default=2024, help="random seed for the generator benchmark")
+    parser.add_argument("--box-size", type=int, default=3, help="box size for the generator benchmark (4 = 16x16)")
+    parser.add_argument("--json", dest="json_path", default=None, help="write machine-readable results to this file")
+    args = parser.parse_args(argv)
+
+    engines = [name for name in args.engines.split(",") if name]
+    for name in engines:
+        if name not in ENGINES:
+            parser.error(f"unknown engine {name!r}, choose from {','.join(ENGINES)}")
+    set_names = [name for name in args.sets.split(",") if name]
+    for name in set_names:
+        if name not in PUZZLE_SETS:
+            parser.error(f"unknown puzzle set {name!r}, choose from {','.join(PUZZLE_SETS)}")
+
+    graph = constraint_graph()
+    puzzle_sets = {name: PUZZLE_SETS[name] for name in set_names}
+    for path in args.corpus:
+        with CorpusReader(path) as reader:
+            if reader.box_size != 3:
+                parser.error(f"{path}: the solver benchmark runs on 9x9 puzzles")
+            puzzle_sets[path] = list(reader.lines(0, args.limit))
+
+    results = {
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "box_size": args.box_size,
+        "repeat": args.repeat,
+        "solver": {},
+        "generator": {},
+    }
+
+    print(f"{'benchmark':<22} {'puz/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'nodes':>9} {'revisions':>10} {'peak KB':>9}")
+    for engine_name in engines:
+        for set_name, puzzles in puzzle_sets.items():
+            result = bench_solver(engine_name, puzzles, graph, args.repeat)
+            results["solver"].setdefault(engine_name, {})[set_name] = result
+            print(format_row(f"{engine_name}/{set_name}", result))
+
+    if args.generate:
+        for difficulty in ("Easy", "Medium", "Hard"):
+            result = bench_generator(difficulty, args.generate, args.seed, args.box_size)
+            results["generator"][difficulty] = result
+            size = args.box_size * args.box_size
+            print(format_row(f"generate{size}x{size}/{difficulty}", result))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
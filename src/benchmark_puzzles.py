@@ -0,0 +1,62 @@
+"""Fixed puzzle sets for benchmark.py, so runs stay comparable across changes.
+
+Easy/Medium/Hard are the first ten puzzles grader.grade labels Easy, Medium
+and Hard among those generate_sudoku produced with random.seed(2024),
+dug to the Easy clue target until ten Easy ones were found, then to Hard.
+"""
+
+EASY = [
+    "036000092000037418001800035900006000200783901307210046170428569080305004000961000",
+    "870300291401000358009120006008500027007681004000240805010863402760900580002000019",
+    "040820673000345102002006000400001059219508764560002300651903407700004010080210000",
+    "000760549420503106500008300002609400030001000958347012260970053080100290349080000",
+    "504103902080092150921500008008910020756324890210000000105079080690000007002030540",
+    "906431805840607391035289000000074508000005000089310760300020180028043000051700040",
+    "000000738060200400305000062038070240546308017027410803054092000700100620019080574",
+    "080042951049361000000508004004209007798156040020074096005900432407020180000003600",
+    "000057108086003070007018020005869007963040800708130690370900040601574080850306000",
+    "080534001561782000340006250030018500605070082000960003800007190090351020104809600",
+]
+
+MEDIUM = [
+    "002500010835610000079402006700004103093020600080007000017040800900006000000201004",
+    "020017800000240005384600000005100403010009050090800001900580006106000000058704009",
+    "380400090000310580060500230100230600030079105070080020004800050800900000650700000",
+    "900000082800200000507000400108736050003905001000821030609070105000000706700690000",
+    "050000027100850000000120950030400009400071000080006000007065810010238000500704302",
+    "006027800008501300300600004800030040104005002509000006005003670700450003600700008",
+    "002006801000800000000009650590207040400061083016400920960000008030104000200000039",
+    "400057800807009206050028007000005000000300074700002600508206300100700560004093000",
+    "070000025208500004100300600027000543503007000081000002000700260012060079000092001",
+    "000000205090040607506209000000980300630107500109600000060390708083000060007010400",
+]
+
+HARD = [
+    "900301500800294007300500200090006700250000916100000020000005301000039602000010079",
+    "802004000000025000040809000008002310200087004009010050936500200720608003004000690",
+    "002038000030529047400017000540003086003006004068100000350000409000004200920060000",
+    "320004007040000300069000240000020000100380475005901003050000810610000002200410930",
+    "040205070000000000310000020670004005025180760000000010264800957080090006500467000",
+    "000050090409200071675009000056002008000100040047005900704000800591038400002900000",
+    "004070695067000100190008007059300010780010300300580070000095001008702000400000700",
+    "200010300070308900000000000057100080090000400600007501030089106980031740000674800",
+    "000029006327860590005007020038006452000040910002000600040000001209000740050000200",
+    "050300008300001409060000073030805000010230007820417350080020000000000004740500031",
+]
+
+# well known hard instances
+HARDEST = [
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400", # Arto Inkala 2012
+    "100007090030020008009600500005300900010080002600004000300000010040000007007000300", # AI Escargot
+    "000000039000001005003050800008090006070002000100400000009080050020000600400700000", # Golden Nugget
+    "100000002090400050006000700050903000000070000000850040700000600030009080002000001", # Easter Monster
+    "000000010400000000020000000000050407008000300001090000300400200050100000000806000", # 17 clues
+    "000000000000003085001020000000507000004000100090000000500000073002010000000040009", # 17 clues
+]
+
+PUZZLE_SETS = {
+    "Easy": EASY,
+    "Medium": MEDIUM,
+    "Hard": HARD,
+    "Hardest": HARDEST,
+}
@@ -0,0 +1,22 @@
+from array import array
+
+GAME_SIZE = 9
+
+def full_mask(size: int = GAME_SIZE) -> int:
+    """Domain holding every value 1..size"""
+    return (1 << size) - 1
+
+def mask_to_values(mask: int) -> list[int]:
+    """Values contained in a domain mask, in ascending order"""
+    values = []
+    while mask:
+        bit = mask & -mask
+        values.append(bit.bit_length())
+        mask ^= bit
+    return values
+
+def make_domains(board: list[int], size: int = GAME_SIZE) -> array:
+    """Build the compact domain array for a flat board (0 = empty) of a size x size grid"""
+    full = full_mask(size)
+    # 16-bit cells up to 16x16, 32-bit cells beyond
+    return array('H' if size <= 16 else 'L', (1 << (val - 1) if val != 0 else full for val in board))
@@ -0,0 +1,30 @@
+from make_constrain import box_size_for
+
+EMPTY_CHARS = "0."
+# one character per value: 1-9 then A.. for 10 and up (16x16 uses 1-9A-G, 25x25 1-9A-P)
+SYMBOLS = "123456789ABCDEFGHIJKLMNOP"
+
+def parse_board(line: str) -> list[int]:
+    """Parse a puzzle line into a flat board.
+
+    The line has one character per cell ('0' or '.' for empty cells), so its
+    length picks the grid: 16 for 4x4, 81 for 9x9, 256 for 16x16, 625 for 25x25.
+    """
+    line = line.strip()
+    try:
+        size = box_size_for(len(line)) ** 2
+    except ValueError:
+        raise ValueError(f"expected 16, 81, 256 or 625 cells, got {len(line)}") from None
+    board = []
+    for ch in line.upper():
+        if ch in EMPTY_CHARS:
+            board.append(0)
+            continue
+        value = SYMBOLS.find(ch) + 1
+        if not 0 < value <= size:
+            raise ValueError(f"invalid cell character {ch!r}")
+        board.append(value)
+    return board
+
+def format_board(board: list[int]) -> str:
+    return ''.join(SYMBOLS[val - 1] if val != 0 else '0' for val in board)
@@ -0,0 +1,205 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+
+from board_io import format_board
+from canonical import DedupIndex
+from corpus import CorpusWriter
+from grader import Grader
+from sudoku_generator import generate_sudoku
+
+# clue target each difficulty is dug to: fewer clues give far more Medium and
+# Hard grades, and the grader rather than the clue count decides the label
+GENERATE_AS = {
+    "Easy": "Easy",
+    "Medium": "Hard",
+    "Hard": "Hard",
+}
+
+# labels the grader can give a generated puzzle, where not all of them: 4x4
+# puzzles never need more than naked singles
+REACHABLE = {
+    2: ("Easy",),
+}
+
+# generation tasks allowed per puzzle of a quota before giving up; about 1 in
+# 25 puzzles dug for Hard grades Hard on 9x9
+ATTEMPTS_PER_PUZZLE = 100
+
+class QuotaError(RuntimeError):
+    """A difficulty quota could not be filled within its attempt budget"""
+
+# graders of this process by box size
+_graders = {}
+
+def task_seed(seed: int, difficulty: str, index: int) -> str:
+    """Seed of one generation task; depends only on the task, not on which worker runs it"""
+    return f"{seed}:{difficulty}:{index}"
+
+def generate_task(task: tuple) -> tuple:
+    """Generate the puzzle of one (difficulty, index, seed, box_size) task.
+
+    Returns (difficulty, index, puzzle, accepted); a puzzle is accepted when
+    the grader labels it with the difficulty asked for.
+    """
+    difficulty, index, seed, box_size = task
+    random.seed(task_seed(seed, difficulty, index))
+    puzzle = generate_sudoku(GENERATE_AS[difficulty], box_size)
+    grader = _graders.get(box_size)
+    if grader is None:
+        grader = _graders[box_size] = Grader(box_size)
+    return difficulty, index, puzzle, grader.grade(puzzle).label == difficulty
+
+def generate_bulk(quotas: dict, workers: int = 1, seed: int = 0, box_size: int = 3, stats: dict = None,
+                  dedup: DedupIndex = None, attempts: int = ATTEMPTS_PER_PUZZLE):
+    """Generate puzzles until every difficulty quota is filled, yielding (difficulty, puzzle).
+
+    Difficulties are the grader's labels (see grader.LABELS).
+
+    Each difficulty has its own stream of tasks, seeded by task_seed, and
+    the quota takes the first accepted puzzles of that stream in order, so
+    a run gives the same puzzles for the same seed whatever the number of
+    workers. With workers != 1 the tasks fan out over a process pool
+    (0 or None = one per CPU) with a few tasks per worker in flight.
+    `stats`, if given, is filled with the number of tasks run, rejected and
+    duplicate. With a `dedup` index, puzzles it already holds (up to
+    symmetry) are skipped and the new ones are added.
+
+    A difficulty gets `attempts` tasks per puzzle of its quota; QuotaError
+    is raised once they are used up without filling it. A difficulty the
+    grader never gives on this grid size is a ValueError up front.
+    """
+    for difficulty, count in quotas.items():
+        if difficulty not in GENERATE_AS:
+            raise ValueError(f"unknown difficulty {difficulty!r}")
+        if count > 0 and difficulty not in REACHABLE.get(box_size, GENERATE_AS):
+            size = box_size * box_size
+            raise ValueError(f"the grader never labels {size}x{size} puzzles {difficulty}")
+    remaining = {difficulty: count for difficulty, count in quotas.items() if count > 0}
+    budget = {difficulty: count * attempts for difficulty, count in remaining.items()}
+    done = dict.fromkeys(remaining, 0)  # tasks finished per difficulty
+    if stats is not None:
+        stats.update(tasks=0, rejected=0, duplicate=0)
+    if not remaining:
+        return
+
+    workers = 1 if workers == 1 else workers or os.cpu_count() or 1
+    slots = threading.Semaphore(workers * 4)
+    stop = threading.Event()
+
+    def feed():
+        # runs on the pool's task thread when parallel; blocks while too many tasks are in flight
+        index = dict.fromkeys(remaining, 0)
+        while True:
+            pending = [difficulty for difficulty in index
+                       if remaining[difficulty] > 0 and index[difficulty] < budget[difficulty]]
+            if not pending:
+                return
+            for difficulty in pending:
+                slots.acquire()
+                if stop.is_set():
+                    return
+                yield difficulty, index[difficulty], seed, box_size
+                index[difficulty] += 1
+
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        # results come back in task order, which keeps each stream in index order
+        results = pool.imap(generate_task, feed()) if pool is not None else map(generate_task, feed())
+        for difficulty, _, puzzle, accepted in results:
+            slots.release()
+            done[difficulty] += 1
+            if stats is not None:
+                stats["tasks"] += 1
+                stats["rejected"] += not accepted
+            if accepted and remaining[difficulty] > 0:
+                if dedup is not None and not dedup.add(puzzle):
+                    if stats is not None:
+                        stats["duplicate"] += 1
+                    continue
+                remaining[difficulty] -= 1
+                yield difficulty, puzzle
+            if not any(remaining.values()):
+                break
+            if remaining[difficulty] > 0 and done[difficulty] >= budget[difficulty]:
+                made = quotas[difficulty] - remaining[difficulty]
+                raise QuotaError(f"only {made} of {quotas[difficulty]} {difficulty} puzzles after "
+                                 f"{budget[difficulty]} attempts; raise --attempts or ask for fewer")
+    finally:
+        stop.set()
+        slots.release()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate large puzzle sets, one file per difficulty")
+    for difficulty in GENERATE_AS:
+        parser.add_argument(f"--{difficulty.lower()}", type=int, default=0, metavar="N",
+                            help=f"{difficulty} puzzles to generate")
+    parser.add_argument("-o", "--output", default=".", help="directory for easy.txt, medium.txt, hard.txt (default: .)")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="worker processes, 0 = one per CPU (default 1)")
+    parser.add_argument("--seed", type=int, default=0, help="base seed; the same seed gives the same puzzles")
+    parser.add_argument("--box-size", type=int, default=3, choices=(2, 3, 4, 5), help="3 = 9x9 (default), 4 = 16x16")
+    parser.add_argument("--binary", action="store_true",
+                        help="write binary corpora (easy.sdkc, ...; see corpus) instead of puzzle lines")
+    parser.add_argument("--attempts", type=int, default=ATTEMPTS_PER_PUZZLE,
+                        help=f"generation attempts allowed per requested puzzle (default {ATTEMPTS_PER_PUZZLE})")
+    parser.add_argument("--dedup", metavar="INDEX",
+                        help="SQLite dedup index: skip puzzles it holds (up to symmetry) and add the new ones")
+    args = parser.parse_args(argv)
+
+    quotas = {difficulty: getattr(args, difficulty.lower()) for difficulty in GENERATE_AS}
+    if not any(quotas.values()):
+        parser.error("nothing to generate, give at least one of --easy/--medium/--hard")
+    if args.attempts < 1:
+        parser.error("--attempts must be at least 1")
+    for difficulty, count in quotas.items():
+        if count > 0 and difficulty not in REACHABLE.get(args.box_size, GENERATE_AS):
+            size = args.box_size * args.box_size
+            parser.error(f"the grader never labels {size}x{size} puzzles {difficulty}")
+
+    os.makedirs(args.output, exist_ok=True)
+    if args.binary:
+        files = {difficulty: CorpusWriter(os.path.join(args.output, f"{difficulty.lower()}.sdkc"), args.box_size)
+                 for difficulty, count in quotas.items() if count > 0}
+    else:
+        files = {difficulty: open(os.path.join(args.output, f"{difficulty.lower()}.txt"), "w")
+                 for difficulty, count in quotas.items() if count > 0}
+    counts = dict.fromkeys(files, 0)
+    stats = {}
+    index = DedupIndex(args.dedup) if args.dedup else None
+    start = time.perf_counter()
+    error = None
+    try:
+        for difficulty, puzzle in generate_bulk(quotas, args.workers, args.seed, args.box_size, stats, index,
+                                                args.attempts):
+            files[difficulty].write(puzzle if args.binary else format_board(puzzle) + "\n")
+            counts[difficulty] += 1
+    except QuotaError as e:
+        error = e
+    finally:
+        for f in files.values():
+            f.close()
+        if index is not None:
+            index.close()
+
+    total = sum(counts.values())
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{k}: {v}" for k, v in counts.items())
+    accepted = stats["tasks"] - stats["rejected"]
+    rate = 100 * accepted / stats["tasks"] if stats["tasks"] else 0.0
+    print(f"{total} puzzles in {elapsed:.2f}s ({summary}; {stats['tasks']} generated, "
+          f"{stats['rejected']} graded otherwise, {rate:.0f}% accepted, {stats['duplicate']} duplicates)",
+          file=sys.stderr)
+    if error is not None:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import sqlite3
+from math import isqrt
+from typing import NamedTuple
+
+from board_io import format_board
+from make_constrain import box_size_for
+
+class Transform(NamedTuple):
+    """Maps a board onto its canonical form: canonical[r][c] = relabel[board'[rows[r]][cols[c]]]
+    where board' is the board, transposed first when `transposed`."""
+    transposed: bool
+    rows: tuple     # row of board' placed at each canonical row
+    cols: tuple     # column of board' placed at each canonical column
+    relabel: tuple  # value -> canonical value, relabel[0] == 0
+
+def _transpose(board: list[int], size: int) -> list[int]:
+    return [board[c * size + r] for r in range(size) for c in range(size)]
+
+class _Plan(NamedTuple):
+    """Row orders worth trying for canonical_form, as the choices at each step.
+
+    Bands and the rows inside a band are sorted by clue-count invariants that
+    column permutations and relabelling leave unchanged; only items with
+    equal keys are interchangeable.
+    """
+    bands: list         # band position -> bands that may go there
+    rows: list          # band -> row position within it -> rows that may go there
+    band_contents: list # band -> its rows, to skip swapping identical bands
+    row_contents: list  # row -> its cells, to skip swapping identical (e.g. empty) rows
+
+def _slots(items, keys) -> list[list[int]]:
+    """For each position of items sorted by key, the items with that position's key"""
+    items = sorted(items, key=lambda item: keys[item])
+    return [[other for other in items if keys[other] == keys[item]] for item in items]
+
+def _line_plan(board: list[int], size: int, box_size: int) -> _Plan:
+    row_keys = []
+    rows = []
+    for r in range(size):
+        row = tuple(board[r * size:(r + 1) * size])
+        stacks = sorted(sum(1 for val in row[s:s + box_size] if val) for s in range(0, size, box_size))
+        row_keys.append((sum(stacks), tuple(stacks)))
+        rows.append(row)
+
+    band_rows = []
+    band_keys = []
+    bands = []
+    for band in range(box_size):
+        members = range(band * box_size, (band + 1) * box_size)
+        band_rows.append(_slots(members, row_keys))
+        band_keys.append(tuple(sorted(row_keys[r] for r in members)))
+        bands.append(tuple(rows[r] for r in members))
+    return _Plan(_slots(range(box_size), band_keys), band_rows, bands, rows)
+
+def _choices(candidates, used, contents):
+    """Unused candidates, skipping any with the same contents as one before it"""
+    seen = set()
+    for item in candidates:
+        if not used[item] and contents[item] not in seen:
+            seen.add(contents[item])
+            yield item
+
+def _line_orders(plan: _Plan, size: int, box_size: int):
+    """Every row order of a plan, generated lazily"""
+    order = [0] * size
+    used_bands = [False] * box_size
+    used_rows = [False] * size
+
+    def fill(i, band):
+        if i == size:
+            yield tuple(order)
+            return
+        if i % box_size == 0:
+            for band in _choices(plan.bands[i // box_size], used_bands, plan.band_contents):
+                used_bands[band] = True
+                yield from fill_row(i, band)
+                used_bands[band] = False
+        else:
+            yield from fill_row(i, band)
+
+    def fill_row(i, band):
+        for r in _choices(plan.rows[band][i % box_size], used_rows, plan.row_contents):
+            used_rows[r] = True
+            order[i] = r
+            yield from fill(i + 1, band)
+            used_rows[r] = False
+
+    return fill(0, None)
+
+def _signature(board: list[int], size: int, box_size: int) -> tuple:
+    """Clue-count invariant used to choose between a board and its transpose"""
+    bands = []
+    for band in range(box_size):
+        cells = board[band * box_size * size:(band + 1) * box_size * size]
+        bands.append(sum(1 for val in cells if val))
+    stacks = []
+    for stack in range(box_size):
+        stacks.append(sum(1 for r in range(size) for c in range(stack * box_size, (stack + 1) * box_size)
+                          if board[r * size + c]))
+    return tuple(sorted(bands)), tuple(sorted(stacks))
+
+# row relabellings canonical_form may spend on one board before giving up;
+# typical puzzles need under a thousand, full grids tens of thousands and more
+WORK_BUDGET = 20000
+
+class _OutOfBudget(Exception):
+    pass
+
+def canonical_form(board: list[int], budget: int = WORK_BUDGET) -> tuple[list[int], Transform]:
+    """Canonical representative of a board under the Sudoku symmetries.
+
+    Boards that differ only by transposition, band / stack swaps, row and
+    column swaps within a band or stack, and relabelling of the values get
+    the same canonical board. It is the lexicographically smallest board
+    (empty cells first, values numbered by first appearance) over the
+    transforms whose line order agrees with the clue-count invariants, so it
+    is found by a pruned search over a small candidate set rather than all
+    2 * 6^8 transforms of a 9x9 grid. Returns the board and the Transform
+    that produces it.
+
+    Boards with many ties (full grids above all) can have far too many
+    candidates; once `budget` row relabellings are spent the board itself is
+    returned with the identity transform. That is still a member of its own
+    symmetry class, so keys of different boards never collide, but its
+    symmetric copies are no longer recognised.
+    """
+    box_size = box_size_for(len(board))
+    size = box_size * box_size
+
+    views = []
+    plain = _signature(board, size, box_size)
+    flipped = _transpose(board, size)
+    turned = _signature(flipped, size, box_size)
+    if plain <= turned:
+        views.append((False, board))
+    if turned <= plain:
+        views.append((True, flipped))
+
+    best = None
+    best_transform = None
+    work = [budget]
+    try:
+        for transposed, view in views:
+            row_plan = _line_plan(view, size, box_size)
+            col_plan = _line_plan(_transpose(view, size), size, box_size)
+            for cols in _line_orders(col_plan, size, box_size):
+                # the view with its columns already in this order
+                lines = [[view[r * size + c] for c in cols] for r in range(size)]
+                found = _best_rows(lines, row_plan, best, work)
+                if found is not None:
+                    best, rows, relabel = found
+                    best_transform = Transform(transposed, rows, cols, relabel)
+    except _OutOfBudget:
+        identity = tuple(range(size))
+        return list(board), Transform(False, identity, identity, tuple(range(size + 1)))
+    return best, best_transform
+
+def _best_rows(lines: list[list[int]], plan: _Plan, best: list[int] | None, work: list):
+    """Smallest relabelled board over the row orders of `plan`, if smaller than `best`.
+
+    Rows are chosen depth first and relabelled as they are placed; a prefix
+    larger than the best board so far is cut together with every order below
+    it. work[0] counts the row relabellings left and _OutOfBudget is raised
+    when it runs out. Returns (board, rows, relabel) or None.
+    """
+    size = len(lines)
+    box_size = isqrt(size)
+    out = [0] * (size * size)
+    order = [0] * size
+    used_bands = [False] * box_size
+    used_rows = [False] * size
+    found = None
+
+    def place(i, band, relabel, next_label, smaller) -> bool:
+        """Try each row that may go at depth i; returns whether best improved"""
+        nonlocal best, found
+        improved = False
+        start = i * size
+        for r in _choices(plan.rows[band][i % box_size], used_rows, plan.row_contents):
+            work[0] -= 1
+            if work[0] < 0:
+                raise _OutOfBudget()
+            row_relabel = relabel.copy()
+            label = next_label
+            for j, val in enumerate(lines[r]):
+                if val and not row_relabel[val]:
+                    row_relabel[val] = label
+                    label += 1
+                out[start + j] = row_relabel[val]
+            row_smaller = smaller
+            if not row_smaller:
+                row = out[start:start + size]
+                other = best[start:start + size]
+                if row > other:
+                    continue
+                row_smaller = row < other
+            used_rows[r] = True
+            order[i] = r
+            if i + 1 == size:
+                if row_smaller:
+                    best = out.copy()
+                    # values that never appear take the remaining labels in increasing order
+                    for val in range(1, size + 1):
+                        if not row_relabel[val]:
+                            row_relabel[val] = label
+                            label += 1
+                    found = (best, tuple(order), tuple(row_relabel))
+                    improved = True
+            elif descend(i + 1, band, row_relabel, label, row_smaller):
+                improved = True
+            used_rows[r] = False
+            if improved:
+                smaller = False # best now shares this prefix
+        return improved
+
+    def descend(i, band, relabel, next_label, smaller) -> bool:
+        if i % box_size:
+            return place(i, band, relabel, next_label, smaller)
+        improved = False
+        for band in _choices(plan.bands[i // box_size], used_bands, plan.band_contents):
+            used_bands[band] = True
+            if place(i, band, relabel, next_label, smaller):
+                improved = True
+                smaller = False
+            used_bands[band] = False
+        return improved
+
+    descend(0, None, [0] * (size + 1), 1, best is None)
+    return found
+
+def apply_transform(board: list[int], transform: Transform) -> list[int]:
+    """Board in the canonical frame of `transform`, e.g. a solution of the original"""
+    size = isqrt(len(board))
+    view = _transpose(board, size) if transform.transposed else board
+    relabel = transform.relabel
+    return [relabel[view[r * size + c]] for r in transform.rows for c in transform.cols]
+
+def invert_transform(board: list[int], transform: Transform) -> list[int]:
+    """Map a board in the canonical frame (e.g. the canonical solution) back to the original"""
+    size = isqrt(len(board))
+    unlabel = [0] * (size + 1)
+    for val, label in enumerate(transform.relabel):
+        unlabel[label] = val
+    view = [0] * len(board)
+    for i, r in enumerate(transform.rows):
+        for j, c in enumerate(transform.cols):
+            view[r * size + c] = unlabel[board[i * size + j]]
+    return _transpose(view, size) if transform.transposed else view
+
+def canonical_key(board: list[int]) -> str:
+    """Canonical form as a puzzle line, the same for every symmetric copy of a board"""
+    return format_board(canonical_form(board)[0])
+
+class DedupIndex:
+    """On-disk set of canonical puzzle keys, backed by SQLite.
+
+    add() returns whether a board (or any symmetric copy of it) is new.
+    Inserts are committed every `commit_every` additions and on close().
+    """
+
+    def __init__(self, path: str, commit_every: int = 1000):
+        # the batch solver feeds puzzles from the pool's task thread
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY)")
+        self.commit_every = commit_every
+        self.pending = 0
+
+    def __contains__(self, board) -> bool:
+        key = canonical_key(board)
+        return self.db.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def add(self, board: list[int]) -> bool:
+        cursor = self.db.execute("INSERT OR IGNORE INTO seen (key) VALUES (?)", (canonical_key(board),))
+        if cursor.rowcount:
+            self.pending += 1
+            if self.pending >= self.commit_every:
+                self.db.commit()
+                self.pending = 0
+        return cursor.rowcount == 1
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,201 @@
+import argparse
+import mmap
+import struct
+import sys
+
+from board_io import format_board, parse_board
+from make_constrain import box_size_for
+
+# file layout: an 8-byte header (magic, version, box size, bits per cell)
+# followed by fixed-size records, so record n starts at HEADER.size + n * record
+# size and the file needs no separate index
+MAGIC = b"SDKC"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBx")
+
+# hex digit -> cell value, for decoding 4-bit records
+_HEX_VALUES = bytes.maketrans(b"0123456789abcdef", bytes(range(16)))
+
+def cell_bits(box_size: int) -> int:
+    """Bits per cell: a nibble while values fit in 0..15 (4x4 and 9x9), a byte above"""
+    return 4 if box_size * box_size < 16 else 8
+
+def record_size(box_size: int) -> int:
+    """Bytes per puzzle: 41 for 9x9, 256 for 16x16, 625 for 25x25"""
+    cells = box_size ** 4
+    return (cells * cell_bits(box_size) + 7) // 8
+
+def pack_board(board: list[int]) -> bytes:
+    """One corpus record; 4-bit cells go high nibble first, two per byte"""
+    box_size = box_size_for(len(board))
+    if cell_bits(box_size) == 8:
+        return bytes(board)
+    padded = list(board) + [0] * (len(board) % 2)
+    return bytes(high << 4 | low for high, low in zip(padded[::2], padded[1::2]))
+
+def unpack_board(record, cells: int) -> list[int]:
+    """Flat board of a record of `cells` cells"""
+    if len(record) == cells:
+        return list(record)
+    return list(bytes(record).hex()[:cells].encode().translate(_HEX_VALUES))
+
+def is_corpus(path: str) -> bool:
+    """Whether the file starts with the corpus magic"""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+class CorpusWriter:
+    """Streams boards of one grid size into a corpus file.
+
+    With `append` an existing corpus of the same grid size is extended.
+    """
+
+    def __init__(self, path: str, box_size: int = 3, append: bool = False):
+        self.box_size = box_size
+        self.cells = box_size ** 4
+        self.count = 0
+        if append:
+            try:
+                with CorpusReader(path) as reader:
+                    if reader.box_size != box_size:
+                        raise ValueError(f"{path} holds {reader.size}x{reader.size} puzzles")
+                    self.count = len(reader)
+            except FileNotFoundError:
+                append = False
+        if append:
+            # drop a partial record so new records stay aligned
+            self.file = open(path, "r+b")
+            self.file.truncate(HEADER.size + self.count * record_size(box_size))
+            self.file.seek(0, 2)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(HEADER.pack(MAGIC, VERSION, box_size, cell_bits(box_size)))
+
+    def write(self, board: list[int]) -> None:
+        if len(board) != self.cells:
+            raise ValueError(f"expected {self.cells} cells, got {len(board)}")
+        self.file.write(pack_board(board))
+        self.count += 1
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class CorpusReader:
+    """Random access to the puzzles of a corpus file through a memory map.
+
+    reader[n] decodes puzzle n, record(n) is a zero-copy view of its bytes and
+    nothing is read before it is used, so opening a corpus of millions of
+    puzzles is instant. A partial record left by an interrupted writer is ignored.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a puzzle corpus")
+            _, version, box_size, bits = HEADER.unpack(header)
+            if version != VERSION or bits != cell_bits(box_size):
+                raise ValueError(f"{path}: unsupported corpus version {version}")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        self.box_size = box_size
+        self.size = box_size * box_size
+        self.cells = self.size * self.size
+        self.record_size = record_size(box_size)
+        self.count = (len(self.map) - HEADER.size) // self.record_size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def record(self, n: int) -> memoryview:
+        """Bytes of puzzle n; release the view before close()"""
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError("puzzle index out of range")
+        start = HEADER.size + n * self.record_size
+        return self.view[start:start + self.record_size]
+
+    def __getitem__(self, n: int) -> list[int]:
+        return unpack_board(self.record(n), self.cells)
+
+    def line(self, n: int) -> str:
+        """Puzzle n as a puzzle line (see board_io)"""
+        record = self.record(n)
+        if self.record_size == self.cells:
+            return format_board(record)
+        return bytes(record).hex()[:self.cells] # values 0..9 are their own hex digits
+
+    def __iter__(self):
+        for n in range(self.count):
+            yield self[n]
+
+    def lines(self, start: int = 0, stop: int = None):
+        for n in range(start, self.count if stop is None else min(stop, self.count)):
+            yield self.line(n)
+
+    def close(self) -> None:
+        self.view.release()
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Convert between puzzle lines and the binary corpus format")
+    parser.add_argument("action", choices=("pack", "unpack", "info"),
+                        help="pack: lines -> corpus, unpack: corpus -> lines, info: corpus summary")
+    parser.add_argument("input", help="puzzle file ('-' for stdin when packing) or corpus")
+    parser.add_argument("output", nargs="?", default="-", help="corpus to write when packing, lines file when unpacking")
+    parser.add_argument("--append", action="store_true", help="add to an existing corpus when packing")
+    args = parser.parse_args(argv)
+
+    if args.action == "pack":
+        if args.output == "-":
+            parser.error("pack needs an output corpus file")
+        stream = sys.stdin if args.input == "-" else open(args.input)
+        writer = None
+        try:
+            for line_no, line in enumerate(stream, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    board = parse_board(line)
+                    if writer is None:
+                        writer = CorpusWriter(args.output, box_size_for(len(board)), args.append)
+                    writer.write(board)
+                except ValueError as e:
+                    print(f"line {line_no}: {e}", file=sys.stderr)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if writer is not None:
+                writer.close()
+        print(f"{writer.count if writer else 0} puzzles in {args.output}", file=sys.stderr)
+        return 0
+
+    with CorpusReader(args.input) as reader:
+        if args.action == "info":
+            print(f"{len(reader)} puzzles, {reader.size}x{reader.size}, {reader.record_size} bytes each")
+            return 0
+        out = sys.stdout if args.output == "-" else open(args.output, "w")
+        try:
+            for line in reader.lines():
+                out.write(line + "\n")
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+import time
+from functools import lru_cache
+from math import isqrt
+
+from search import SOLVED, UNSOLVABLE, EXHAUSTED, PAUSED
+
+# what run() does next
+_START = 0
+_SELECT = 1
+_ADVANCE = 2
+
+@lru_cache(maxsize=None)
+def exact_cover_matrix(box_size: int = 3) -> tuple:
+    """Dancing Links of the empty box_size^2 x box_size^2 grid, built once per box size.
+
+    There are 4 * N^2 constraint columns (cell filled, value in row, value in
+    column, value in box) and one matrix row per (cell, value). Node 0 is the
+    root, nodes 1..4*N^2 the column headers and the rest the matrix cells.
+    Returns (left, right, up, down, column, row id, column sizes) as tuples;
+    row id is cell * size + value - 1.
+    """
+    size = box_size * box_size
+    cells = size * size
+    columns = 4 * cells
+
+    left = list(range(-1, columns)) # header i links to i - 1 and i + 1, in a ring
+    left[0] = columns
+    right = list(range(1, columns + 2))
+    right[columns] = 0
+    up = list(range(columns + 1))
+    down = list(range(columns + 1))
+    column = list(range(columns + 1))
+    row_id = [-1] * (columns + 1)
+    sizes = [0] * (columns + 1)
+
+    for cell in range(cells):
+        r, c = divmod(cell, size)
+        box = (r // box_size) * box_size + c // box_size
+        for v in range(size):
+            first = len(column)
+            for col in (1 + cell,
+                        1 + cells + r * size + v,
+                        1 + 2 * cells + c * size + v,
+                        1 + 3 * cells + box * size + v):
+                node = len(column)
+                # append at the bottom of the column
+                up.append(up[col])
+                down.append(col)
+                down[up[col]] = node
+                up[col] = node
+                # and at the end of the row
+                left.append(node - 1 if node > first else node)
+                right.append(node)
+                if node > first:
+                    right[node - 1] = node
+                    right[node] = first
+                    left[first] = node
+                column.append(col)
+                row_id.append(cell * size + v)
+                sizes[col] += 1
+
+    return tuple(left), tuple(right), tuple(up), tuple(down), tuple(column), tuple(row_id), tuple(sizes)
+
+class DLX:
+    """Knuth's Algorithm X on Dancing Links, as an exact-cover Sudoku engine.
+
+    Works like search.Search: the search runs on an explicit stack, run()
+    stops when a node or time budget runs out and resumes on the next call,
+    and calling run() again after SOLVED looks for the next solution.
+    """
+
+    def __init__(self, board: list[int], stats=None):
+        self.size = isqrt(len(board))
+        self.box_size = isqrt(self.size)
+        left, right, up, down, column, row_id, sizes = exact_cover_matrix(self.box_size)
+        self.left = list(left)
+        self.right = list(right)
+        self.up = list(up)
+        self.down = list(down)
+        self.column = column
+        self.row_id = row_id
+        self.sizes = list(sizes)
+        self.board = list(board)
+        self.stats = stats
+        self.stack = []  # (column, matrix node of the row being tried)
+        self.nodes = 0
+        self.backtracks = 0
+        self.solutions = 0
+        self.status = None
+        self._state = _START
+
+    def cover(self, col: int) -> None:
+        left, right, up, down, column, sizes = self.left, self.right, self.up, self.down, self.column, self.sizes
+        right[left[col]] = right[col]
+        left[right[col]] = left[col]
+        i = down[col]
+        while i != col:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                sizes[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, col: int) -> None:
+        left, right, up, down, column, sizes = self.left, self.right, self.up, self.down, self.column, self.sizes
+        i = up[col]
+        while i != col:
+            j = left[i]
+            while j != i:
+                sizes[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[col]] = col
+        left[right[col]] = col
+
+    def select_column(self) -> int:
+        """Uncovered column with the fewest rows left, 0 when every column is covered"""
+        right, sizes = self.right, self.sizes
+        best = 0
+        min_size = self.size + 1
+        col = right[0]
+        while col != 0:
+            if sizes[col] < min_size:
+                min_size = sizes[col]
+                best = col
+                if min_size <= 1:
+                    break
+            col = right[col]
+        return best
+
+    def _place_givens(self) -> bool:
+        """Cover the columns of every given; False if two givens clash"""
+        size = self.size
+        cells = size * size
+        box_size = self.box_size
+        right = self.right
+        covered = bytearray(4 * cells + 1)
+        for cell, val in enumerate(self.board):
+            if val == 0:
+                continue
+            r, c = divmod(cell, size)
+            box = (r // box_size) * box_size + c // box_size
+            cols = (1 + cell,
+                    1 + cells + r * size + val - 1,
+                    1 + 2 * cells + c * size + val - 1,
+                    1 + 3 * cells + box * size + val - 1)
+            if any(covered[col] for col in cols):
+                return False
+            for col in cols:
+                covered[col] = 1
+                self.cover(col)
+        # a column may be left with no rows only if it has been covered
+        col = right[0]
+        while col != 0:
+            if self.sizes[col] == 0:
+                return False
+            col = right[col]
+        return True
+
+    def solution(self) -> list[int]:
+        """The board with the rows chosen so far: the solution once run() returns SOLVED"""
+        board = list(self.board)
+        size = self.size
+        row_id = self.row_id
+        for col, node in self.stack:
+            if node != col: # a column whose first row is not tried yet
+                cell, v = divmod(row_id[node], size)
+                board[cell] = v + 1
+        return board
+
+    partial = solution
+
+    def run(self, max_nodes: int = None, time_limit: float = None) -> str:
+        """Search until a solution, exhaustion or the budget; returns the status"""
+        stats = self.stats
+        if stats is None:
+            return self._run(max_nodes, time_limit)
+
+        start = time.perf_counter()
+        try:
+            return self._run(max_nodes, time_limit)
+        finally:
+            stats.nodes = self.nodes
+            stats.backtracks = self.backtracks
+            stats.total_time += time.perf_counter() - start
+
+    def _run(self, max_nodes: int, time_limit: float) -> str:
+        if self.status in (UNSOLVABLE, EXHAUSTED):
+            return self.status
+
+        node_limit = None if max_nodes is None else self.nodes + max_nodes
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+
+        right, left, down = self.right, self.left, self.down
+        column = self.column
+        stack = self.stack
+        stats = self.stats
+        state = self._state
+
+        if state == _START:
+            if not self._place_givens():
+                self.status = UNSOLVABLE
+                return self.status
+            state = _SELECT
+
+        while True:
+            if state == _SELECT:
+                col = self.select_column()
+                if col == 0:
+                    self.solutions += 1
+                    self.status = SOLVED
+                    self._state = _ADVANCE
+                    return self.status
+                self.cover(col)
+                stack.append((col, col))
+                if stats is not None and len(stack) > stats.max_depth:
+                    stats.max_depth = len(stack)
+                state = _ADVANCE
+
+            if ((node_limit is not None and self.nodes >= node_limit)
+                    or (deadline is not None and time.perf_counter() >= deadline)):
+                self._state = state
+                self.status = PAUSED
+                return self.status
+
+            if not stack:
+                self.status = EXHAUSTED if self.solutions else UNSOLVABLE
+                return self.status
+
+            col, node = stack[-1]
+            if node != col: # take back the row tried last
+                j = left[node]
+                while j != node:
+                    self.uncover(column[j])
+                    j = left[j]
+
+            node = down[node]
+            if node == col: # every row failed
+                self.uncover(col)
+                stack.pop()
+                self.backtracks += 1
+                continue
+
+            stack[-1] = (col, node)
+            self.nodes += 1
+            j = right[node]
+            while j != node:
+                self.cover(column[j])
+                j = right[j]
+            state = _SELECT
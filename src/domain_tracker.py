@@ -0,0 +1,124 @@
+from arc3 import AC3
+from back_track import undo
+from bit_domains import full_mask, make_domains
+
+MODES = ("simple", "ac3")
+
+class DomainTracker:
+    """Domains of a board being edited, updated per edit instead of recomputed.
+
+    "simple" mode: the values no peer holds. Like DigHoleGenerator it keeps,
+    per cell and value, how many peers hold that value, so an edit only
+    touches the edited cell and its peers.
+
+    "ac3" mode: the AC-3 domains. A new value propagates from its cell
+    only, on top of the current domains, with its changes on a trail segment
+    of its own. Clearing a value undoes that segment and replays the values
+    set after it. A value AC-3 had already ruled out, an edit on a
+    contradicted board, or clearing a value the board was loaded with
+    recomputes everything.
+
+    set() returns the cells whose domain may have changed.
+    """
+
+    def __init__(self, board: list[int], graph, mode: str = "simple"):
+        if mode not in MODES:
+            raise ValueError(f"unknown domain mode {mode!r}")
+        self.mode = mode
+        self.peers = graph.peers
+        self.size = graph.size
+        self.full = full_mask(graph.size)
+        self.engine = AC3.from_graph(graph) if mode == "ac3" else None
+        self.load(board)
+
+    def load(self, board: list[int]) -> None:
+        """Start over from a whole board"""
+        self.board = list(board)
+        if self.mode == "simple":
+            size = self.size
+            self.support = [0] * (len(board) * size)
+            for cell, val in enumerate(board):
+                if val:
+                    for peer in self.peers[cell]:
+                        self.support[peer * size + val - 1] += 1
+            self.domains = make_domains(board, size)
+            for cell, val in enumerate(board):
+                if not val:
+                    self.domains[cell] = self.full & ~self.blocked(cell)
+            return
+        self.domains = make_domains(board, self.size)
+        self.failed = not self.engine.propagate_bits(self.domains)
+        self.given = {cell for cell, val in enumerate(board) if val}
+        self.trail = []
+        self.edits = []  # (cell, trail mark, failed before) of each value set since load
+
+    def blocked(self, cell: int) -> int:
+        """Values held by the peers of cell (simple mode)"""
+        support = self.support
+        base = cell * self.size
+        mask = 0
+        for v in range(self.size):
+            if support[base + v]:
+                mask |= 1 << v
+        return mask
+
+    def set(self, cell: int, val: int):
+        """Put val (0 = clear) in cell; returns the cells whose domain may have changed"""
+        old = self.board[cell]
+        if old == val:
+            return ()
+        if self.mode == "simple":
+            return self._set_simple(cell, old, val)
+
+        touched = set()
+        self.board[cell] = 0
+        if old and (cell in self.given or not self._retract(cell, touched)):
+            self.board[cell] = val
+            self.load(self.board)
+            return range(len(self.board))
+        self.board[cell] = val
+        if val and not self._assign(cell, touched):
+            self.load(self.board)
+            return range(len(self.board))
+        return touched
+
+    def _set_simple(self, cell: int, old: int, val: int):
+        size = self.size
+        support = self.support
+        domains = self.domains
+        board = self.board
+        board[cell] = val
+        for peer in self.peers[cell]:
+            base = peer * size - 1
+            if old:
+                support[base + old] -= 1
+            if val:
+                support[base + val] += 1
+            if not board[peer]:
+                domains[peer] = self.full & ~self.blocked(peer)
+        domains[cell] = 1 << (val - 1) if val else self.full & ~self.blocked(cell)
+        return (cell,) + self.peers[cell]
+
+    def _retract(self, cell: int, touched: set) -> bool:
+        """Undo the edit of cell and replay the ones after it; False if a full recompute is needed"""
+        i = next(i for i, edit in enumerate(self.edits) if edit[0] == cell)
+        _, mark, self.failed = self.edits[i]
+        later = [edit[0] for edit in self.edits[i + 1:]]
+        del self.edits[i:]
+        touched.update(var for var, _ in self.trail[mark:])
+        touched.add(cell)
+        undo(self.domains, self.trail, mark)
+        return all(self._assign(var, touched) for var in later)
+
+    def _assign(self, cell: int, touched: set) -> bool:
+        """Propagate the value of cell from the current domains; False if a full recompute is needed"""
+        bit = 1 << (self.board[cell] - 1)
+        if self.failed or not self.domains[cell] & bit:
+            return False
+        mark = len(self.trail)
+        self.edits.append((cell, mark, self.failed))
+        self.trail.append((cell, self.domains[cell]))
+        self.domains[cell] = bit
+        self.failed = not self.engine.propagate_bits(self.domains, (cell,), self.trail)
+        touched.update(var for var, _ in self.trail[mark:])
+        return True
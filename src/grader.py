@@ -0,0 +1,94 @@
+import time
+from typing import NamedTuple
+
+from arc3 import AC3
+from bit_domains import make_domains
+from inference import HIDDEN_SINGLES, POINTING, NAKED_SUBSETS, HIDDEN_SUBSETS, ALL_TECHNIQUES, Propagator
+from make_constrain import box_size_for, constraint_graph
+from search import Search, SOLVED
+from solve_puzzle import run_search, PAUSED, CANCELLED
+
+NAKED_SINGLES = "naked_singles"  # what AC-3 does on its own
+SEARCH = "search"                # guessing, once no technique applies
+
+# techniques in the order a human solver would reach for them
+LADDER = (HIDDEN_SINGLES, POINTING, NAKED_SUBSETS, HIDDEN_SUBSETS)
+
+# score per use of each step of the ladder (naked singles are free)
+WEIGHTS = {
+    HIDDEN_SINGLES: 1,
+    POINTING: 4,
+    NAKED_SUBSETS: 8,
+    HIDDEN_SUBSETS: 12,
+    SEARCH: 50,
+}
+
+# difficulty label by the hardest step a puzzle needs
+LABELS = {
+    NAKED_SINGLES: "Easy",
+    HIDDEN_SINGLES: "Medium",
+    POINTING: "Medium",
+    NAKED_SUBSETS: "Medium",
+    HIDDEN_SUBSETS: "Hard",
+    SEARCH: "Hard",
+}
+
+# label of a puzzle whose search ran out of budget before deciding
+UNDECIDED = "Undecided"
+
+class Grade(NamedTuple):
+    label: str      # Easy, Medium or Hard; "Invalid" when the puzzle has no solution, UNDECIDED out of budget
+    score: int      # weighted technique uses plus search nodes
+    hardest: str    # hardest step needed: NAKED_SINGLES, a LADDER technique or SEARCH
+    counts: dict    # cells narrowed per technique
+    nodes: int      # search nodes once the ladder got stuck
+
+class Grader:
+    """Grades puzzles of one grid size by the techniques needed to solve them.
+
+    The puzzle is propagated with AC-3 and the LADDER techniques, always
+    taking the simplest one that still makes progress. If that does not
+    solve it, the rest is searched with every technique switched on and the
+    search nodes are counted. Keep one Grader per process to grade a corpus.
+
+    `max_nodes`, `time_limit` and `cancel` bound that search as in
+    solve_puzzle.solve; when they cut it short the grade is UNDECIDED,
+    with the nodes searched so far.
+    """
+
+    def __init__(self, box_size: int = 3):
+        self.graph = constraint_graph(box_size)
+        self.engine = AC3.from_graph(self.graph)
+
+    def grade(self, board: list[int], max_nodes: int = None, time_limit: float = None, cancel=None) -> Grade:
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        graph = self.graph
+        domains = make_domains(board, graph.size)
+        ladder = Propagator(graph, LADDER, self.engine)
+        if not ladder.propagate(domains):
+            return Grade("Invalid", 0, SEARCH, ladder.counts, 0)
+
+        counts = {name: ladder.counts[name] for name in LADDER}
+        hardest = NAKED_SINGLES
+        for name in LADDER:
+            if counts[name]:
+                hardest = name
+        nodes = 0
+        if any(mask & (mask - 1) for mask in domains):
+            search = Search(board, graph.peers, propagator=Propagator(graph, ALL_TECHNIQUES, self.engine),
+                            domains=domains)
+            remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            status = run_search(search, max_nodes, remaining, cancel)
+            if status in (PAUSED, CANCELLED):
+                return Grade(UNDECIDED, 0, SEARCH, counts, search.nodes)
+            if status != SOLVED:
+                return Grade("Invalid", 0, SEARCH, counts, search.nodes)
+            hardest = SEARCH
+            nodes = search.nodes
+
+        score = sum(WEIGHTS[name] * count for name, count in counts.items()) + WEIGHTS[SEARCH] * nodes
+        return Grade(LABELS[hardest], score, hardest, counts, nodes)
+
+def grade(board: list[int], max_nodes: int = None, time_limit: float = None, cancel=None) -> Grade:
+    """Grade one flat board (0 = empty) of any N^2 x N^2 grid, within an optional search budget"""
+    return Grader(box_size_for(len(board))).grade(board, max_nodes, time_limit, cancel)
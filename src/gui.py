@@ -1,19 +1,35 @@
+import argparse
 import tkinter as tk
 from tkinter import messagebox, ttk
 import threading
 
-from sudoku_generator import generate_sudoku, get_difficulty
-from make_constrain import make_constrain
-from back_track import back_track
-from arc3 import ac3
+from grader import grade, UNDECIDED
+from puzzle_pool import PuzzlePool
+from sudoku_generator import generate_sudoku
+from make_constrain import constraint_graph
+from solve_puzzle import solve, count_solutions, SOLVED, TIMED_OUT, CANCELLED
+from bit_domains import mask_to_values
+from domain_tracker import DomainTracker
 
-GAME_SIZE = 9
+# seconds the Check button may spend counting solutions, and again grading
+CHECK_TIME_LIMIT = 5.0
+
+# seconds Solve may search before giving up
+SOLVE_TIME_LIMIT = 60.0
+
+# puzzles kept ready per difficulty by box size, so the difficulty buttons answer
+# at once; the pool fills on a thread of the GUI process, and one Hard 16x16
+# takes seconds of CPU and a 25x25 tens of seconds, so large grids keep fewer or none
+POOL_SIZES = {2: 2, 3: 2, 4: 1, 5: 0}
 
 class SudokuGUI:
-    def __init__(self, root):
+    def __init__(self, root, box_size=3):
         self.root = root
+        self.box_size = box_size
+        self.size = box_size * box_size  # values / cells per row
+        self.cell_count = self.size * self.size
         self.root.title("🧩 CSP Sudoku Solver - AI Powered")
-        self.root.geometry("750x800")
+        self.root.geometry("750x800" if box_size <= 3 else "1100x1000")
         self.root.configure(bg='#1a1a2e')
         
         # Make window resizable
@@ -38,17 +54,21 @@ class SudokuGUI:
         self.cells = []
         self.cell_frames = []
         self.domain_labels = []  # New: labels to show domains
-        self.game_state = [0] * 81
-        self.initial_state = [0] * 81
+        self.game_state = [0] * self.cell_count
+        self.initial_state = [0] * self.cell_count
         self.is_solving = False
-        self.game_constrains = [[] for _ in range(81)]
+        self.is_generating = False
+        self.is_checking = False
+        self.cancel_event = None  # set to stop the running solve, generation or check
+        self.graph = constraint_graph(box_size)
+        self.game_constrains = self.graph.peers
         self.show_domains = False  # Toggle for domain display
         self.domain_mode = "simple"  # "simple" or "ac3"
-        
-        # Setup constraints once
-        make_constrain(self.game_constrains)
+        self.domain_tracker = None  # DomainTracker of the board while domains are shown
+        self.domain_texts = [("", None)] * self.cell_count  # (text, color) each label shows
         
         self.create_widgets()
+        self.pool = PuzzlePool(box_size, POOL_SIZES[box_size])
         
     def create_widgets(self):
         # Create canvas with scrollbar for scrollable content
@@ -121,15 +141,17 @@ class SudokuGUI:
         grid_frame = tk.Frame(grid_container, bg=self.colors['grid_dark'])
         grid_frame.pack(padx=2, pady=2)
         
-        # Create 9x9 Sudoku grid
-        for row in range(9):
+        # Create the Sudoku grid (smaller cells for 16x16 and 25x25)
+        cell_font = 20 if self.box_size <= 3 else max(7, 36 // self.box_size)
+        cell_pad = 10 if self.box_size <= 3 else 2
+        for row in range(self.size):
             row_cells = []
             row_frames = []
             row_domain_labels = []
-            for col in range(9):
-                # Determine background color (alternating 3x3 boxes)
-                box_row = row // 3
-                box_col = col // 3
+            for col in range(self.size):
+                # Determine background color (alternating boxes)
+                box_row = row // self.box_size
+                box_col = col // self.box_size
                 bg_color = self.colors['grid_dark'] if (box_row + box_col) % 2 == 0 else self.colors['grid_light']
                 
                 # Cell container frame
@@ -140,9 +162,9 @@ class SudokuGUI:
                     highlightthickness=1
                 )
                 
-                # Extra padding for 3x3 box separation
-                padx = (4, 1) if col % 3 == 0 else (1, 1)
-                pady = (4, 1) if row % 3 == 0 else (1, 1)
+                # Extra padding for box separation
+                padx = (4, 1) if col % self.box_size == 0 else (1, 1)
+                pady = (4, 1) if row % self.box_size == 0 else (1, 1)
                 
                 cell_container.grid(row=row, column=col, padx=padx, pady=pady)
                 
@@ -150,7 +172,7 @@ class SudokuGUI:
                 entry = tk.Entry(
                     cell_container,
                     width=3,
-                    font=("Helvetica", 20, "bold"),
+                    font=("Helvetica", cell_font, "bold"),
                     justify="center",
                     fg=self.colors['text'],
                     bg=bg_color,
@@ -158,7 +180,7 @@ class SudokuGUI:
                     insertbackground=self.colors['highlight'],
                     bd=0
                 )
-                entry.pack(padx=10, pady=(8, 2))
+                entry.pack(padx=cell_pad, pady=(8, 2))
                 
                 # Domain label (initially hidden)
                 domain_label = tk.Label(
@@ -255,6 +277,25 @@ class SudokuGUI:
         )
         solve_btn.pack(side=tk.LEFT, padx=2)
         self.add_hover_effect(solve_btn)
+
+        cancel_btn = tk.Button(
+            action_buttons_frame,
+            text="⏹ Cancel",
+            command=self.cancel_operation,
+            state=tk.DISABLED,
+            font=("Helvetica", 9, "bold"),
+            fg=self.colors['text'],
+            bg='#7f8c8d',
+            activebackground='#95a5a6',
+            activeforeground=self.colors['text'],
+            bd=0,
+            padx=12,
+            pady=6,
+            cursor="hand2"
+        )
+        cancel_btn.pack(side=tk.LEFT, padx=2)
+        self.add_hover_effect(cancel_btn)
+        self.cancel_btn = cancel_btn  # Enabled while solving or generating
         
         check_btn = tk.Button(
             action_buttons_frame,
@@ -357,21 +398,21 @@ class SudokuGUI:
         button.bind("<Leave>", on_leave)
     
     def validate_input(self, new_value):
-        """Validate that input is a single digit 1-9 or empty"""
+        """Validate that input is a number 1..size (a single digit 1-9 on 9x9) or empty"""
         if new_value == "":
             return True
-        if new_value.isdigit() and len(new_value) == 1 and new_value != "0":
+        if new_value.isdigit() and len(new_value) <= len(str(self.size)) and 1 <= int(new_value) <= self.size:
             return True
         return False
     
     def check_cell_conflict(self, row, col):
         """Check if current cell has conflicts and highlight in red"""
-        idx = row * 9 + col
+        idx = row * self.size + col
         val = self.cells[row][col].get()
         
         # Get background color for this cell
-        box_row = row // 3
-        box_col = col // 3
+        box_row = row // self.box_size
+        box_col = col // self.box_size
         bg_color = self.colors['grid_dark'] if (box_row + box_col) % 2 == 0 else self.colors['grid_light']
         
         if val == "" or not val.isdigit():
@@ -387,8 +428,8 @@ class SudokuGUI:
         
         # Check all neighbors for conflicts
         for neighbor_idx in self.game_constrains[idx]:
-            neighbor_row = neighbor_idx // 9
-            neighbor_col = neighbor_idx % 9
+            neighbor_row = neighbor_idx // self.size
+            neighbor_col = neighbor_idx % self.size
             neighbor_val = self.cells[neighbor_row][neighbor_col].get()
             
             if neighbor_val.isdigit() and int(neighbor_val) == current_value:
@@ -414,13 +455,18 @@ class SudokuGUI:
         # Check for conflicts
         self.check_cell_conflict(row, col)
         
-        # Update domains if enabled
+        # Update domains if enabled: only the cells the edit can affect
         if self.show_domains:
-            self.update_domain_display()
+            if self.domain_tracker is None:
+                self.update_domain_display()
+                return
+            val = self.cells[row][col].get()
+            changed = self.domain_tracker.set(row * self.size + col, int(val) if val.isdigit() else 0)
+            self.refresh_domain_labels(changed)
     
     def has_any_conflicts(self, board):
         """Check if board has any conflicts"""
-        for i in range(81):
+        for i in range(self.cell_count):
             if board[i] != 0:
                 for neighbor in self.game_constrains[i]:
                     if board[neighbor] == board[i]:
@@ -429,24 +475,26 @@ class SudokuGUI:
     
     def get_board_from_ui(self):
         """Extract board state from UI as flat list"""
-        board = [0] * 81
-        for r in range(9):
-            for c in range(9):
+        board = [0] * self.cell_count
+        for r in range(self.size):
+            for c in range(self.size):
                 val = self.cells[r][c].get()
                 if val.isdigit() and val != "":
-                    board[r * 9 + c] = int(val)
+                    board[r * self.size + c] = int(val)
         return board
     
     def update_ui_from_board(self, board, highlight_new=False):
         """Update UI from board state"""
-        for r in range(9):
-            for c in range(9):
-                idx = r * 9 + c
+        changed = []
+        for r in range(self.size):
+            for c in range(self.size):
+                idx = r * self.size + c
                 val = board[idx]
                 current_val = self.cells[r][c].get()
                 str_val = str(val) if val != 0 else ""
                 
                 if current_val != str_val:
+                    changed.append(idx)
                     self.cells[r][c].delete(0, tk.END)
                     if val != 0:
                         self.cells[r][c].insert(0, str_val)
@@ -458,17 +506,25 @@ class SudokuGUI:
                         elif highlight_new:
                             # Newly solved
                             self.cells[r][c].config(fg=self.colors['solving'])
-                
-        self.root.update()
+
+        # Tk redraws once the event loop is idle; only the domains of changed cells are updated
+        if self.show_domains and changed:
+            if self.domain_tracker is None:
+                self.update_domain_display()
+                return
+            touched = set()
+            for idx in changed:
+                touched.update(self.domain_tracker.set(idx, board[idx]))
+            self.refresh_domain_labels(touched)
     
     def clear_board(self):
         """Clear all cells"""
-        for r in range(9):
-            for c in range(9):
+        for r in range(self.size):
+            for c in range(self.size):
                 self.cells[r][c].delete(0, tk.END)
                 self.cells[r][c].config(state=tk.NORMAL, fg=self.colors['text'])
-                self.domain_labels[r][c].config(text="")
-        self.initial_state = [0] * 81
+        self.clear_domain_labels()
+        self.initial_state = [0] * self.cell_count
         self.show_domains = False
         self.domains_btn.config(text="👁️ Domains")
         self.status_var.set("Board cleared! Ready for new puzzle. 🎯")
@@ -482,10 +538,7 @@ class SudokuGUI:
             self.update_domain_display()
         else:
             self.domains_btn.config(text="👁️ Domains")
-            # Clear all domain labels
-            for r in range(9):
-                for c in range(9):
-                    self.domain_labels[r][c].config(text="")
+            self.clear_domain_labels()
     
     def toggle_domain_mode(self):
         """Toggle between simple and AC-3 domain modes"""
@@ -501,196 +554,149 @@ class SudokuGUI:
             self.update_domain_display()
     
     def update_domain_display(self):
-        """Calculate and display domains based on current mode"""
-        if self.domain_mode == "simple":
-            self.update_domain_display_simple()
-        else:
-            self.update_domain_display_ac3()
-    
-    def update_domain_display_simple(self):
-        """Calculate and display current available values for each empty cell (Simple Mode)"""
-        try:
-            board = self.get_board_from_ui()
-            
-            # For each empty cell, calculate which values are NOT used by its neighbors
-            for r in range(9):
-                for c in range(9):
-                    idx = r * 9 + c
-                    
-                    if board[idx] == 0:  # Only show for empty cells
-                        # Start with all possible values
-                        available_values = set(range(1, 10))
-                        
-                        # Remove values used by neighbors (same row, column, or box)
-                        for neighbor_idx in self.game_constrains[idx]:
-                            neighbor_value = board[neighbor_idx]
-                            if neighbor_value != 0:
-                                available_values.discard(neighbor_value)
-                        
-                        # Display the available values
-                        if len(available_values) == 0:
-                            domain_text = "✗"
-                            color = '#ff3333'  # Red - no valid values (conflict)
-                        elif len(available_values) == 1:
-                            domain_text = str(list(available_values)[0])
-                            color = '#2ecc71'  # Green - only one choice
-                        else:
-                            # Format domain - show all available values
-                            domain_list = sorted(list(available_values))
-                            if len(domain_list) <= 3:
-                                # Short domain: show in one line
-                                domain_text = ''.join(str(d) for d in domain_list)
-                            elif len(domain_list) <= 6:
-                                # Medium domain: show in two lines
-                                mid = (len(domain_list) + 1) // 2
-                                line1 = ''.join(str(d) for d in domain_list[:mid])
-                                line2 = ''.join(str(d) for d in domain_list[mid:])
-                                domain_text = f"{line1}\n{line2}"
-                            else:
-                                # Long domain: show in three lines (max 9 digits: 123/456/789)
-                                domain_text = ''.join(str(d) for d in domain_list[:3]) + '\n'
-                                domain_text += ''.join(str(d) for d in domain_list[3:6]) + '\n'
-                                domain_text += ''.join(str(d) for d in domain_list[6:])
-                            color = self.colors['text_dim']  # Gray - multiple choices
-                        
-                        self.domain_labels[r][c].config(text=domain_text, fg=color)
-                    else:
-                        # Filled cells don't show domains
-                        self.domain_labels[r][c].config(text="")
-            
-            self.root.update()
-            
-        except Exception as e:
-            print(f"Error updating domain display (simple): {e}")
-            import traceback
-            traceback.print_exc()
-            # Clear domains on error
-            for r in range(9):
-                for c in range(9):
-                    self.domain_labels[r][c].config(text="")
-    
-    def update_domain_display_ac3(self):
-        """Calculate and display AC-3 reduced domains (AC-3 Mode)"""
-        try:
-            board = self.get_board_from_ui()
-            
-            # Setup constraints
-            game_constrains = [[] for _ in range(81)]
-            make_constrain(game_constrains)
-            
-            # Setup initial domains based on CURRENT board state
-            domains = []
-            for val in board:
-                if val != 0:
-                    domains.append({val})  # Filled cells get singleton domain
+        """Recompute the domains of the whole board in the current mode and display them"""
+        self.domain_tracker = DomainTracker(self.get_board_from_ui(), self.graph, self.domain_mode)
+        self.refresh_domain_labels(range(self.cell_count))
+
+    def refresh_domain_labels(self, cells):
+        """Show the tracked domains of `cells`, configuring only labels whose text changes"""
+        tracker = self.domain_tracker
+        for idx in cells:
+            if tracker.board[idx] != 0:
+                # Filled cells don't show domains
+                text, color = "", None
+            else:
+                domain = tracker.domains[idx]
+                if domain == 0:
+                    text, color = "✗", '#ff3333'  # Red - no valid values (conflict)
+                elif domain & (domain - 1) == 0:
+                    text, color = str(domain.bit_length()), '#2ecc71'  # Green - only one choice
                 else:
-                    domains.append(set(range(1, 10)))  # Empty cells get full domain
-            
-            # Apply AC-3 to get reduced domains
-            ac3_result = ac3(game_constrains, domains)
-            
-            # Display domains
-            for r in range(9):
-                for c in range(9):
-                    idx = r * 9 + c
-                    if board[idx] == 0:  # Only show for empty cells
-                        domain = domains[idx]
-                        if len(domain) == 0:
-                            domain_text = "✗"
-                            color = '#ff3333'  # Red - no valid values (conflict)
-                        elif len(domain) == 1:
-                            domain_text = str(list(domain)[0])
-                            color = '#2ecc71'  # Green - AC-3 solved this cell
-                        else:
-                            # Format domain - show all AC-3 reduced values
-                            domain_list = sorted(list(domain))
-                            if len(domain_list) <= 3:
-                                # Short domain: show in one line
-                                domain_text = ''.join(str(d) for d in domain_list)
-                            elif len(domain_list) <= 6:
-                                # Medium domain: show in two lines
-                                mid = (len(domain_list) + 1) // 2
-                                line1 = ''.join(str(d) for d in domain_list[:mid])
-                                line2 = ''.join(str(d) for d in domain_list[mid:])
-                                domain_text = f"{line1}\n{line2}"
-                            else:
-                                # Long domain: show in three lines (max 9 digits: 123/456/789)
-                                domain_text = ''.join(str(d) for d in domain_list[:3]) + '\n'
-                                domain_text += ''.join(str(d) for d in domain_list[3:6]) + '\n'
-                                domain_text += ''.join(str(d) for d in domain_list[6:])
-                            color = self.colors['text_dim']  # Gray - multiple choices after AC-3
-                        
-                        self.domain_labels[r][c].config(text=domain_text, fg=color)
-                    else:
-                        # Filled cells don't show domains
-                        self.domain_labels[r][c].config(text="")
-            
-            # Clear references to help garbage collection
-            del domains, game_constrains, board
-            
-            self.root.update()
-            
-        except Exception as e:
-            print(f"Error updating domain display (AC-3): {e}")
-            import traceback
-            traceback.print_exc()
-            # Clear domains on error
-            for r in range(9):
-                for c in range(9):
-                    self.domain_labels[r][c].config(text="")
+                    text, color = self.format_domain(mask_to_values(domain)), self.colors['text_dim']
+            if self.domain_texts[idx] != (text, color):
+                self.domain_texts[idx] = (text, color)
+                label = self.domain_labels[idx // self.size][idx % self.size]
+                if color is None:
+                    label.config(text=text)
+                else:
+                    label.config(text=text, fg=color)
+
+    def clear_domain_labels(self):
+        """Blank every domain label and stop tracking domains"""
+        self.domain_tracker = None
+        for idx, (text, _) in enumerate(self.domain_texts):
+            if text:
+                self.domain_labels[idx // self.size][idx % self.size].config(text="")
+        self.domain_texts = [("", None)] * self.cell_count
+    
+    def format_domain(self, domain_list):
+        """Format a sorted domain for a cell label"""
+        if self.size > 9:
+            # Two-digit values: one line per box_size values
+            step = self.box_size
+            return '\n'.join(' '.join(str(d) for d in domain_list[i:i + step])
+                             for i in range(0, len(domain_list), step))
+        if len(domain_list) <= 3:
+            # Short domain: show in one line
+            return ''.join(str(d) for d in domain_list)
+        elif len(domain_list) <= 6:
+            # Medium domain: show in two lines
+            mid = (len(domain_list) + 1) // 2
+            line1 = ''.join(str(d) for d in domain_list[:mid])
+            line2 = ''.join(str(d) for d in domain_list[mid:])
+            return f"{line1}\n{line2}"
+        else:
+            # Long domain: show in three lines (max 9 digits: 123/456/789)
+            domain_text = ''.join(str(d) for d in domain_list[:3]) + '\n'
+            domain_text += ''.join(str(d) for d in domain_list[3:6]) + '\n'
+            domain_text += ''.join(str(d) for d in domain_list[6:])
+            return domain_text
     
     def generate(self, difficulty):
-        """Generate a random puzzle of specified difficulty"""
+        """Show a puzzle of the difficulty: from the pool, else generated on a worker thread"""
         # Prevent multiple generations at once
-        if self.is_solving:
+        if self.is_solving or self.is_generating or self.is_checking:
             messagebox.showwarning("Busy", "Please wait for current operation to complete!")
             return
-            
+
+        board = self.pool.take(difficulty)
+        if board is not None:
+            self.show_generated(difficulty, board)
+            return
+
         self.clear_board()
+        self.is_generating = True
+        self.cancel_event = threading.Event()
+        self.cancel_btn.config(state=tk.NORMAL)
         self.status_var.set(f"Generating {difficulty} puzzle... ⏳")
-        self.root.update()
-        
+        threading.Thread(target=self.generate_logic, args=(difficulty, self.cancel_event), daemon=True).start()
+
+    def generate_logic(self, difficulty, cancel):
+        """Worker thread: generate a puzzle and hand it to the Tk thread"""
+        def progress(update):
+            self.root.after(0, lambda: self.show_generate_progress(difficulty, update))
+
         try:
-            board = generate_sudoku(difficulty)
-            
-            # Check if generation succeeded
-            if board is None or sum(1 for x in board if x != 0) < 17:
-                messagebox.showerror("Generation Failed", "Failed to generate a valid puzzle. Please try again.")
-                self.status_var.set("❌ Generation failed. Try again.")
-                return
-                
-            self.initial_state = board.copy()
-            self.update_ui_from_board(board)
-            
-            # Lock given cells
-            for r in range(9):
-                for c in range(9):
-                    if board[r * 9 + c] != 0:
-                        self.cells[r][c].config(fg=self.colors['given'])
-            
-            givens = sum(1 for x in board if x != 0)
-            self.status_var.set(f"✅ {difficulty} puzzle generated! ({givens} given numbers)")
-            
-            # Update domains if domain view is enabled
-            if self.show_domains:
-                self.update_domain_display()
-                
+            board, error = generate_sudoku(difficulty, self.box_size, cancel=cancel, progress=progress), None
         except Exception as e:
-            print(f"Error generating puzzle: {e}")
-            messagebox.showerror("Error", f"Failed to generate puzzle: {str(e)}")
+            board, error = None, e
+        self.root.after(0, lambda: self.finish_generate(difficulty, board, error))
+
+    def show_generate_progress(self, difficulty, update):
+        if self.is_generating and not self.cancel_event.is_set():
+            self.status_var.set(f"Generating {difficulty} puzzle... ⏳ attempt {update.attempt}, "
+                                f"{update.clues} clues left (target {update.target})")
+
+    def finish_generate(self, difficulty, board, error):
+        self.is_generating = False
+        self.cancel_btn.config(state=tk.DISABLED)
+        if self.cancel_event.is_set():
+            self.status_var.set("⏹ Generation cancelled")
+            return
+        if error is not None:
+            print(f"Error generating puzzle: {error}")
+            messagebox.showerror("Error", f"Failed to generate puzzle: {str(error)}")
             self.status_var.set("❌ Error generating puzzle")
-            self.clear_board()
+            return
+        self.show_generated(difficulty, board)
+
+    def show_generated(self, difficulty, board):
+        """Put a generated puzzle on the board, givens locked"""
+        # Check if generation succeeded
+        if board is None or sum(1 for x in board if x != 0) < 17 * self.cell_count // 81:
+            messagebox.showerror("Generation Failed", "Failed to generate a valid puzzle. Please try again.")
+            self.status_var.set("❌ Generation failed. Try again.")
+            return
+
+        self.clear_board()
+        self.initial_state = board.copy()
+        self.update_ui_from_board(board)
+
+        # Lock given cells
+        for r in range(self.size):
+            for c in range(self.size):
+                if board[r * self.size + c] != 0:
+                    self.cells[r][c].config(fg=self.colors['given'])
+
+        givens = sum(1 for x in board if x != 0)
+        self.status_var.set(f"✅ {difficulty} puzzle generated! ({givens} given numbers)")
+
+        # Update domains if domain view is enabled
+        if self.show_domains:
+            self.update_domain_display()
     
     def check_solvability(self):
-        """Validate board and check if it has a unique solution using AC-3 only"""
+        """Validate board, then count its solutions on a worker thread"""
+        if self.is_solving or self.is_generating or self.is_checking:
+            messagebox.showwarning("Busy", "Please wait for the current operation to complete!")
+            return
+
         board = self.get_board_from_ui()
         
-        # Setup constraints
-        game_constrains = [[] for _ in range(81)]
-        make_constrain(game_constrains)
+        game_constrains = self.game_constrains
         
         # Check for conflicts
-        for i in range(81):
+        for i in range(self.cell_count):
             if board[i] != 0:
                 for neighbor in game_constrains[i]:
                     if board[neighbor] == board[i]:
@@ -698,50 +704,66 @@ class SudokuGUI:
                         messagebox.showerror("Invalid Board", "There is a conflict in the board!\nSame number appears in row/column/box.")
                         return
         
-        # Setup domains for AC-3
-        domains = []
-        for val in board:
-            if val != 0:
-                domains.append({val})
-            else:
-                domains.append(set(range(1, 10)))
-        
-        # Apply AC-3
-        domains_copy = [d.copy() for d in domains]
-        if not ac3(game_constrains, domains_copy):
-            self.status_var.set("❌ Board is unsolvable!")
-            messagebox.showerror("Unsolvable Board", "This board has no solution!\nAC-3 detected inconsistency.")
+        self.is_checking = True
+        self.cancel_event = threading.Event()
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.status_var.set("🔍 Counting solutions...")
+        threading.Thread(target=self.check_logic, args=(board, self.cancel_event), daemon=True).start()
+
+    def check_logic(self, board, cancel):
+        """Worker thread: count solutions (stopping at the second) and grade a unique one"""
+        try:
+            count = count_solutions(board, limit=2, time_limit=CHECK_TIME_LIMIT, cancel=cancel)
+            result = grade(board, time_limit=CHECK_TIME_LIMIT, cancel=cancel) if count == 1 else None
+            error = None
+        except Exception as e:
+            count, result, error = None, None, e
+        self.root.after(0, lambda: self.finish_check(board, count, result, error))
+
+    def finish_check(self, board, count, result, error):
+        """Show the outcome of a check on the Tk thread"""
+        self.is_checking = False
+        self.cancel_btn.config(state=tk.DISABLED)
+        if self.cancel_event.is_set():
+            self.status_var.set("⏹ Check cancelled")
             return
-        
-        # Check if AC-3 alone gives a unique solution (all domains have size 1)
-        unsolved_cells = sum(1 for d in domains_copy if len(d) > 1)
-        
-        if unsolved_cells == 0:
-            # AC-3 solved it completely - unique solution
-            difficulty = get_difficulty(board)
-            givens = sum(1 for x in board if x != 0)
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to check the board: {error}")
+            self.status_var.set("❌ Error checking the board")
+            return
+        givens = sum(1 for x in board if x != 0)
+
+        if count == 0:
+            self.status_var.set("❌ Board is unsolvable!")
+            messagebox.showerror("Unsolvable Board", "This board has no solution!")
+        elif count == 1:
+            if result.label == UNDECIDED:
+                difficulty = f"{UNDECIDED} (grading took over {CHECK_TIME_LIMIT:g} seconds)"
+            else:
+                difficulty = f"{result.label} (score {result.score}, hardest step: {result.hardest})"
             self.status_var.set(f"✅ Board has unique solution! Difficulty: {difficulty}")
             messagebox.showinfo(
                 "✅ Valid & Unique Solution",
-                f"✅ Board is valid and has a UNIQUE solution!\n"
-                f"(Verified by Arc Consistency only)\n\n"
+                f"✅ Board is valid and has a UNIQUE solution!\n\n"
                 f"📊 Difficulty: {difficulty}\n"
-                f"🔢 Given numbers: {givens}/81\n"
-                f"📝 Empty cells: {81 - givens}"
+                f"🔢 Given numbers: {givens}/{self.cell_count}\n"
+                f"📝 Empty cells: {self.cell_count - givens}"
+            )
+        elif count == 2:
+            self.status_var.set("⚠️ Board has multiple solutions!")
+            messagebox.showwarning(
+                "⚠️ Multiple Solutions",
+                f"⚠️ Board is valid but has MULTIPLE solutions!\n\n"
+                f"🔢 Given numbers: {givens}/{self.cell_count}\n\n"
+                f"Note: Use 'Solve with AI' to find one of them."
             )
         else:
-            # AC-3 didn't solve it completely - may have multiple solutions
-            difficulty = get_difficulty(board)
-            givens = sum(1 for x in board if x != 0)
-            self.status_var.set(f"⚠️ Board may have multiple solutions! ({unsolved_cells} cells unsolved by AC-3)")
+            self.status_var.set("⚠️ Uniqueness check timed out")
             messagebox.showwarning(
-                "⚠️ Multiple Solutions Possible",
-                f"⚠️ Board is valid but may have MULTIPLE solutions!\n"
-                f"(Arc Consistency alone couldn't solve it)\n\n"
-                f"📊 Difficulty: {difficulty}\n"
-                f"🔢 Given numbers: {givens}/81\n"
-                f"📝 Unsolved cells after AC-3: {unsolved_cells}\n\n"
-                f"Note: Use 'Solve with AI' to find a solution using backtracking."
+                "⚠️ Check Timed Out",
+                f"⚠️ Could not decide within {CHECK_TIME_LIMIT:g} seconds whether the board\n"
+                f"has a unique solution.\n\n"
+                f"🔢 Given numbers: {givens}/{self.cell_count}"
             )
     
     def start_solve(self):
@@ -750,60 +772,88 @@ class SudokuGUI:
             messagebox.showwarning("Already Solving", "Solver is already running!")
             return
         
+        if self.is_generating or self.is_checking:
+            messagebox.showwarning("Busy", "Please wait for the current operation to complete!")
+            return
+
         board = self.get_board_from_ui()
         self.initial_state = board.copy()
         
         self.is_solving = True
+        self.cancel_event = threading.Event()
+        self.cancel_btn.config(state=tk.NORMAL)
         self.status_var.set("🤖 AI Solver running... Applying Arc Consistency!")
         
         # Run in separate thread
         threading.Thread(target=self.solve_logic, args=(board,), daemon=True).start()
     
     def solve_logic(self, initial_board):
-        """Main solving logic using your algorithms"""
-        game_constrains = [[] for _ in range(81)]
-        make_constrain(game_constrains)
-        
-        # Setup domains
-        domains = []
-        for val in initial_board:
-            if val != 0:
-                domains.append({val})
-            else:
-                domains.append(set(range(1, 10)))
-        
-        # Apply initial AC3
-        self.root.after(0, lambda: self.status_var.set("🔄 Applying Arc Consistency (AC-3)..."))
-        
-        if not ac3(game_constrains, domains):
-            self.root.after(0, lambda: self.finish_solve(False, "❌ Puzzle is unsolvable (detected by AC-3)"))
-            return
-        
-        self.root.after(0, lambda: self.status_var.set("🔍 Backtracking with MAC..."))
+        """Main solving logic: AC-3, then iterative backtracking with MAC"""
+        self.root.after(0, lambda: self.status_var.set("🔍 Arc Consistency (AC-3) + backtracking with MAC..."))
         
-        # Backtracking with visualization
-        solution_found = back_track(initial_board, domains, game_constrains)
+        result = solve(initial_board, time_limit=SOLVE_TIME_LIMIT, cancel=self.cancel_event,
+                       progress=self.report_progress)
+        stats = result.stats
         
-        if solution_found:
+        if result.status == SOLVED:
             # Update final board
-            self.root.after(0, lambda: self.update_ui_from_board(initial_board))
-            self.root.after(0, lambda: self.finish_solve(True, "✅ Puzzle solved successfully! 🎉"))
+            self.root.after(0, lambda: self.update_ui_from_board(result.solution))
+            self.root.after(0, lambda: self.finish_solve(True, "✅ Puzzle solved successfully! 🎉", stats))
+        elif result.status == CANCELLED:
+            self.root.after(0, lambda: self.finish_solve(False, "⏹ Solve cancelled", stats, notify=False))
+        elif result.status == TIMED_OUT:
+            self.root.after(0, lambda: self.finish_solve(
+                False, f"⏱️ No solution found within {SOLVE_TIME_LIMIT:g} seconds", stats))
+        elif stats.nodes == 0:
+            self.root.after(0, lambda: self.finish_solve(False, "❌ Puzzle is unsolvable (detected by AC-3)", stats))
         else:
-            self.root.after(0, lambda: self.finish_solve(False, "❌ No solution found!"))
+            self.root.after(0, lambda: self.finish_solve(False, "❌ No solution found!", stats))
     
-    def finish_solve(self, success, message):
+    def report_progress(self, progress):
+        """Progress callback of the solver thread: hand the update to the Tk thread"""
+        self.root.after(0, lambda: self.show_progress(progress))
+
+    def show_progress(self, progress):
+        """Show the partial board and search counters while solving"""
+        if not self.is_solving or self.cancel_event.is_set():
+            return
+        self.update_ui_from_board(progress.board, highlight_new=True)
+        self.status_var.set(f"🔍 Searching... {progress.nodes} nodes, depth {progress.depth}, "
+                            f"{progress.seconds:.1f}s")
+
+    def cancel_operation(self):
+        """Ask the running solve, generation or check to stop; it ends within a fraction of a second"""
+        if (self.is_solving or self.is_generating or self.is_checking) and self.cancel_event is not None:
+            self.cancel_event.set()
+            self.status_var.set("⏹ Cancelling...")
+
+    def finish_solve(self, success, message, stats=None, notify=True):
         """Finish solving and update UI"""
         self.is_solving = False
-        self.status_var.set(message)
+        self.cancel_btn.config(state=tk.DISABLED)
+        if not success:
+            # drop the partial board shown while searching
+            self.update_ui_from_board(self.initial_state)
+        if stats is not None:
+            self.status_var.set(f"{message} ({stats})")
+        else:
+            self.status_var.set(message)
         
+        if not notify:
+            return
         if success:
             messagebox.showinfo("Success! 🎉", "Puzzle solved successfully using CSP + AC-3!")
         else:
             messagebox.showwarning("No Solution", message)
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CSP Sudoku Solver")
+    parser.add_argument("--box-size", type=int, default=3, choices=[2, 3, 4, 5],
+                        help="box size: 2 = 4x4, 3 = 9x9 (default), 4 = 16x16, 5 = 25x25")
+    args = parser.parse_args(argv)
+
     root = tk.Tk()
-    app = SudokuGUI(root)
+    app = SudokuGUI(root, args.box_size)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+from itertools import combinations
+
+from arc3 import AC3
+
+# Propagation techniques layered on top of AC-3 (which already does naked singles).
+# Each one works on the row/column/box units of the constraint graph and can be
+# switched on or off independently.
+HIDDEN_SINGLES = "hidden_singles"  # a value with one place left in a unit goes there
+NAKED_SUBSETS = "naked_subsets"    # k cells of a unit holding only k values between them
+HIDDEN_SUBSETS = "hidden_subsets"  # k values of a unit that fit only in the same k cells
+POINTING = "pointing"              # box-line reduction: pointing and claiming
+
+ALL_TECHNIQUES = (HIDDEN_SINGLES, NAKED_SUBSETS, HIDDEN_SUBSETS, POINTING)
+
+# pairs and triples
+MAX_SUBSET = 3
+
+class Contradiction(Exception):
+    pass
+
+def _narrow(domains, trail, cell: int, mask: int, changed: list) -> None:
+    """Restrict domains[cell] to `mask`, recording the old domain on the trail"""
+    old = domains[cell]
+    new = old & mask
+    if new == old:
+        return
+    if new == 0:
+        raise Contradiction
+    if trail is not None:
+        trail.append((cell, old))
+    domains[cell] = new
+    changed.append(cell)
+
+def hidden_singles(domains, graph, trail, changed: list) -> None:
+    full = (1 << graph.size) - 1
+    for unit in graph.units:
+        once = 0
+        twice = 0
+        for cell in unit:
+            mask = domains[cell]
+            twice |= once & mask
+            once |= mask
+        if once != full: # some value has no place left in this unit
+            raise Contradiction
+        singles = once & ~twice
+        while singles:
+            bit = singles & -singles
+            singles ^= bit
+            for cell in unit:
+                if domains[cell] & bit:
+                    _narrow(domains, trail, cell, bit, changed)
+                    break
+
+def naked_subsets(domains, graph, trail, changed: list, max_size: int = MAX_SUBSET) -> None:
+    for unit in graph.units:
+        open_cells = [cell for cell in unit if domains[cell] & (domains[cell] - 1)]
+        for k in range(2, min(max_size, len(open_cells) - 1) + 1):
+            small = [cell for cell in open_cells if domains[cell].bit_count() <= k]
+            for subset in combinations(small, k):
+                union = 0
+                for cell in subset:
+                    union |= domains[cell]
+                if union.bit_count() < k:
+                    raise Contradiction
+                if union.bit_count() == k:
+                    for cell in open_cells:
+                        if cell not in subset and domains[cell] & union:
+                            _narrow(domains, trail, cell, ~union, changed)
+
+def hidden_subsets(domains, graph, trail, changed: list, max_size: int = MAX_SUBSET) -> None:
+    for unit in graph.units:
+        # where (as a bitmask over unit positions) each unplaced value can still go
+        places = {}
+        for bit_index in range(graph.size):
+            bit = 1 << bit_index
+            where = 0
+            placed = False
+            for pos, cell in enumerate(unit):
+                mask = domains[cell]
+                if mask & bit:
+                    where |= 1 << pos
+                    if mask == bit:
+                        placed = True
+            if not placed:
+                places[bit] = where
+        for k in range(2, min(max_size, len(places) - 1) + 1):
+            small = [bit for bit, where in places.items() if 0 < where.bit_count() <= k]
+            for subset in combinations(small, k):
+                where = 0
+                values = 0
+                for bit in subset:
+                    where |= places[bit]
+                    values |= bit
+                if where.bit_count() < k:
+                    raise Contradiction
+                if where.bit_count() == k:
+                    for pos, cell in enumerate(unit):
+                        if where >> pos & 1:
+                            _narrow(domains, trail, cell, values, changed)
+
+def pointing(domains, graph, trail, changed: list) -> None:
+    units = graph.units
+    cell_units = graph.cell_units
+    size = graph.size
+    for unit_index, unit in enumerate(units):
+        is_box = unit_index >= 2 * size
+        for bit_index in range(size):
+            bit = 1 << bit_index
+            cells = [cell for cell in unit if domains[cell] & bit]
+            if len(cells) < 2:
+                continue
+            if is_box:
+                # pointing: all places in one row or column -> clear the rest of that line
+                targets = [cell_units[cells[0]][line] for line in (0, 1)
+                           if all(cell_units[cell][line] == cell_units[cells[0]][line] for cell in cells)]
+            else:
+                # claiming: all places of a line in one box -> clear the rest of that box
+                box = cell_units[cells[0]][2]
+                targets = [box] if all(cell_units[cell][2] == box for cell in cells) else []
+            for target in targets:
+                for cell in units[target]:
+                    if domains[cell] & bit and cell not in cells:
+                        _narrow(domains, trail, cell, ~bit, changed)
+
+TECHNIQUE_FUNCTIONS = {
+    HIDDEN_SINGLES: hidden_singles,
+    NAKED_SUBSETS: naked_subsets,
+    HIDDEN_SUBSETS: hidden_subsets,
+    POINTING: pointing,
+}
+
+class Propagator:
+    """AC-3 plus the enabled unit-based techniques, run to a common fixpoint.
+
+    Techniques are tried in the order given and propagation goes back to
+    AC-3 as soon as one of them narrows a domain. `counts` records how many cells
+    each technique narrowed (and how many arcs AC-3 revised), which tells
+    how hard a puzzle was.
+    """
+
+    def __init__(self, graph, techniques=ALL_TECHNIQUES, engine: AC3 = None):
+        self.graph = graph
+        self.engine = engine if engine is not None else AC3.from_graph(graph)
+        for name in techniques:
+            if name not in TECHNIQUE_FUNCTIONS:
+                raise ValueError(f"unknown technique {name!r}")
+        self.techniques = list(dict.fromkeys(techniques))
+        self.counts = dict.fromkeys(("ac3",) + ALL_TECHNIQUES, 0)
+
+    def propagate(self, domains, changed=None, trail: list = None, stats=None) -> bool:
+        engine = self.engine
+        graph = self.graph
+        while True:
+            revisions = engine.revisions
+            if not engine.propagate_bits(domains, changed, trail, stats):
+                return False
+            self.counts["ac3"] += engine.revisions - revisions
+
+            changed = []
+            for name in self.techniques:
+                try:
+                    TECHNIQUE_FUNCTIONS[name](domains, graph, trail, changed)
+                except Contradiction:
+                    return False
+                if changed:
+                    self.counts[name] += len(changed)
+                    break
+            if not changed:
+                return True
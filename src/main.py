@@ -1,4 +1,18 @@
-from gui import main
+import sys
+
+# headless sub-commands: python main.py <command> [args]
+COMMANDS = {
+    "batch": "batch",
+    "bench": "benchmark",
+    "generate": "bulk_generate",
+    "corpus": "corpus",
+    "serve": "server",
+}
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        command = __import__(COMMANDS[sys.argv[1]])
+        sys.exit(command.main(sys.argv[2:]))
+
+    from gui import main
     main()
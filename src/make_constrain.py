@@ -1,37 +1,79 @@
-GAME_SIZE = 9
-
-def make_constrain(game_constrains: list[list[int]]) -> None:
-    
-    # add row constrain
-    for pos in range(GAME_SIZE * GAME_SIZE): # current pos
-        pos_row = pos // GAME_SIZE
-        pos_col = pos % GAME_SIZE
-        added = set()  
-        added.add(pos)
-        for i in range(GAME_SIZE): # row constrains
-            pos_alpha = i + pos_row * GAME_SIZE
-
-            if pos_alpha == pos or pos_alpha in added:
-                continue
-            game_constrains[pos].append(pos_alpha)
-            added.add(pos_alpha)
-        
-        for i in range(GAME_SIZE): # column constrains
-            pos_alpha = pos_col + i * GAME_SIZE
-
-            if pos_alpha == pos or pos_alpha in added:
-                continue
-            game_constrains[pos].append(pos_alpha)
-            added.add(pos_alpha)
-       
-           
-        start_row = (pos_row // 3) * 3
-        start_col = (pos_col // 3) * 3
-        
-        for r in range(start_row, start_row + 3):
-            for c in range(start_col, start_col + 3):
-                idx = r * GAME_SIZE + c
+from functools import lru_cache
+from math import isqrt
+from typing import NamedTuple
+
+BOX_SIZE = 3
+
+class ConstraintGraph(NamedTuple):
+    """Immutable constraint graph of one grid geometry, shared by every caller"""
+    box_size: int
+    size: int                 # cells per row / column / box
+    peers: tuple              # cell -> peer cells (row, then column, then box)
+    rows: tuple               # row index -> cells
+    cols: tuple               # column index -> cells
+    boxes: tuple              # box index -> cells
+    units: tuple              # rows + cols + boxes
+    cell_units: tuple         # cell -> (row unit, column unit, box unit) indices into units
+    arcs: tuple               # arc id -> (xi, xj)
+    incoming: tuple           # xj -> ((xi, arc id), ...) for every arc (xi, xj)
+
+@lru_cache(maxsize=None)
+def constraint_graph(box_size: int = BOX_SIZE) -> ConstraintGraph:
+    """Build (once per box size) the peers, units and arcs of a box_size^2 x box_size^2 grid"""
+    size = box_size * box_size
+
+    rows = tuple(tuple(r * size + c for c in range(size)) for r in range(size))
+    cols = tuple(tuple(r * size + c for r in range(size)) for c in range(size))
+    boxes = tuple(
+        tuple((br * box_size + r) * size + bc * box_size + c
+              for r in range(box_size) for c in range(box_size))
+        for br in range(box_size) for bc in range(box_size))
+    units = rows + cols + boxes
+
+    peers = []
+    cell_units = []
+    for pos in range(size * size):
+        row, col = divmod(pos, size)
+        box = (row // box_size) * box_size + col // box_size
+        added = {pos}
+        pos_peers = []
+        for unit in (rows[row], cols[col], boxes[box]):
+            for idx in unit:
                 if idx not in added:
-                    game_constrains[pos].append(idx)
+                    pos_peers.append(idx)
                     added.add(idx)
-   
\ No newline at end of file
+        peers.append(tuple(pos_peers))
+        cell_units.append((row, size + col, 2 * size + box))
+
+    arcs = []
+    incoming = [[] for _ in range(size * size)]
+    for xi, pos_peers in enumerate(peers):
+        for xj in pos_peers:
+            incoming[xj].append((xi, len(arcs)))
+            arcs.append((xi, xj))
+
+    return ConstraintGraph(
+        box_size=box_size,
+        size=size,
+        peers=tuple(peers),
+        rows=rows,
+        cols=cols,
+        boxes=boxes,
+        units=units,
+        cell_units=tuple(cell_units),
+        arcs=tuple(arcs),
+        incoming=tuple(tuple(arcs_in) for arcs_in in incoming),
+    )
+
+def box_size_for(cells: int) -> int:
+    """Box size of a flat board with `cells` cells (81 -> 3, 256 -> 4)"""
+    size = isqrt(cells)
+    box_size = isqrt(size)
+    if box_size < 2 or box_size ** 4 != cells:
+        raise ValueError(f"{cells} cells is not a box^2 x box^2 Sudoku grid")
+    return box_size
+
+def make_constrain(game_constrains: list[list[int]], box_size: int = BOX_SIZE) -> None:
+    """Fill game_constrains[pos] with the peers of pos (row, column and box)"""
+    for pos, pos_peers in enumerate(constraint_graph(box_size).peers):
+        game_constrains[pos].extend(pos_peers)
@@ -0,0 +1,152 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError: # optional: without NumPy every board goes to solve()
+    np = None
+
+from make_constrain import constraint_graph
+from inference import Propagator
+from arc3 import AC3
+from search import Search, SOLVED as SEARCH_SOLVED, PAUSED
+from solve_puzzle import SolveResult, SOLVED, UNSOLVABLE, TIMED_OUT, check_board, solve, default_techniques
+from solver_stats import SolveStats
+
+class BatchPropagator:
+    """Naked and hidden singles on K boards at once, as NumPy bitmask operations.
+
+    The boards are a (K, cells) array of domain bitmasks. One sweep removes
+    every singleton value from its peers' domains and fixes every value that
+    fits only one cell of a unit, for all boards together, using the peer and
+    unit index arrays of the constraint graph.
+    """
+
+    def __init__(self, box_size: int = 3):
+        if np is None:
+            raise ImportError("BatchPropagator needs NumPy")
+        graph = constraint_graph(box_size)
+        self.graph = graph
+        self.size = graph.size
+        self.cells = graph.size * graph.size
+        self.full = (1 << graph.size) - 1
+        # every cell has the same number of peers and units, so these are rectangular
+        self.peers = np.array(graph.peers, dtype=np.intp)
+        self.units = np.array(graph.units, dtype=np.intp)
+        self.cell_units = np.array(graph.cell_units, dtype=np.intp)
+        self.bits = np.array([1 << v for v in range(graph.size)], dtype=np.uint32)
+
+    def domains(self, boards: list[list[int]]):
+        """(K, cells) uint32 domains of flat boards, 0 = empty"""
+        values = np.array(boards, dtype=np.int64)
+        bits = np.left_shift(1, np.maximum(values - 1, 0))
+        return np.where(values > 0, bits, self.full).astype(np.uint32)
+
+    def sweep(self, domains):
+        """One round of naked and hidden singles; returns (new domains, dead boards)"""
+        single = (domains & (domains - 1)) == 0
+        fixed = np.where(single, domains, 0)
+        # naked singles: drop the values fixed in a peer
+        taken = np.bitwise_or.reduce(fixed[:, self.peers], axis=2)
+        domains = domains & ~taken
+
+        # hidden singles: values held by exactly one cell of a unit
+        in_unit = domains[:, self.units]
+        once = np.zeros(in_unit.shape[:2], dtype=np.uint32)
+        twice = np.zeros_like(once)
+        for i in range(self.size):
+            cell = in_unit[:, :, i]
+            twice |= once & cell
+            once |= cell
+        dead = (once != self.full).any(axis=1) # a value with no cell left in some unit
+        only = np.bitwise_or.reduce((once & ~twice)[:, self.cell_units], axis=2)
+        hidden = domains & only
+        domains = np.where(hidden != 0, hidden, domains)
+
+        # an empty domain, or a cell that is the only place for two values
+        dead |= (domains == 0).any(axis=1) | ((hidden & (hidden - 1)) != 0).any(axis=1)
+        return domains, dead
+
+    def propagate(self, domains):
+        """Sweep until no board changes; returns (domains, dead boards).
+
+        Only boards still changing take part in the next sweep; every sweep
+        of a board removes at least one value, so this ends.
+        """
+        domains = domains.copy()
+        dead = np.zeros(len(domains), dtype=bool)
+        active = np.arange(len(domains))
+        while len(active):
+            before = domains[active]
+            after, died = self.sweep(before)
+            domains[active] = after
+            dead[active[died]] = True
+            changed = (after != before).any(axis=1) & ~died
+            active = active[changed]
+        return domains, dead
+
+    def values(self, domains):
+        """(K, cells) cell values of singleton domains, 0 elsewhere"""
+        values = np.zeros(domains.shape, dtype=np.int64)
+        for v, bit in enumerate(self.bits, 1):
+            values[domains == bit] = v
+        return values
+
+# batch propagators of this process by box size
+_propagators = {}
+
+def solve_batch(boards: list[list[int]], max_nodes: int = None, time_limit: float = None,
+                techniques=None) -> list[SolveResult]:
+    """Solve many boards of one grid size, propagating all of them at once first.
+
+    Naked and hidden singles run vectorised over the whole batch (see
+    BatchPropagator); only boards they leave open go on to per-board MAC
+    search from the propagated domains, with `max_nodes`, `time_limit` and
+    `techniques` as in solve_puzzle.solve. Without NumPy every board is
+    simply passed to solve(). Returns one SolveResult per board, in order.
+    """
+    if not boards:
+        return []
+    if np is None:
+        return [solve(board, max_nodes, time_limit, techniques=techniques) for board in boards]
+    box_size = check_board(boards[0])
+    for board in boards:
+        if len(board) != len(boards[0]):
+            raise ValueError("every board of a batch must have the same size")
+        check_board(board)
+
+    if techniques is None:
+        techniques = default_techniques(box_size)
+
+    propagator = _propagators.get(box_size)
+    if propagator is None:
+        propagator = _propagators[box_size] = BatchPropagator(box_size)
+    domains, dead = propagator.propagate(propagator.domains(boards))
+    solved = ~dead & ((domains & (domains - 1)) == 0).all(axis=1)
+    values = propagator.values(domains)
+
+    graph = propagator.graph
+    engine = None
+    search_propagator = None
+    typecode = 'H' if graph.size <= 16 else 'L'
+    results = []
+    for k, board in enumerate(boards):
+        stats = SolveStats()
+        if dead[k]:
+            results.append(SolveResult(UNSOLVABLE, None, stats))
+            continue
+        if solved[k]:
+            results.append(SolveResult(SOLVED, values[k].tolist(), stats))
+            continue
+        if engine is None:
+            engine = AC3.from_graph(graph)
+            search_propagator = Propagator(graph, techniques, engine) if techniques else None
+        search = Search(board, graph.peers, engine, stats, search_propagator,
+                        domains=array(typecode, domains[k].tolist()))
+        status = search.run(max_nodes, time_limit)
+        if status == SEARCH_SOLVED:
+            results.append(SolveResult(SOLVED, search.solution(), stats))
+        elif status == PAUSED:
+            results.append(SolveResult(TIMED_OUT, None, stats))
+        else:
+            results.append(SolveResult(UNSOLVABLE, None, stats))
+    return results
@@ -0,0 +1,66 @@
+import threading
+from collections import deque
+
+from sudoku_generator import generate_sudoku
+
+DIFFICULTIES = ("Easy", "Medium", "Hard")
+
+class PuzzlePool:
+    """A few generated puzzles per difficulty kept ready, refilled by a background thread.
+
+    take() hands out a ready puzzle at once and wakes the refill thread,
+    which tops up the emptiest difficulty first and sleeps while every
+    difficulty holds `size` puzzles. close() stops the thread, cancelling a
+    generation in progress. With size 0 no thread is started and take()
+    always returns None.
+    """
+
+    def __init__(self, box_size: int = 3, size: int = 2, difficulties=DIFFICULTIES):
+        self.box_size = box_size
+        self.size = size
+        self.puzzles = {difficulty: deque() for difficulty in difficulties}
+        self.changed = threading.Condition()
+        self.closed = threading.Event()
+        self.thread = None
+        if size > 0:
+            self.thread = threading.Thread(target=self._refill, name="puzzle-pool", daemon=True)
+            self.thread.start()
+
+    def take(self, difficulty: str) -> list[int] | None:
+        """A ready puzzle of this difficulty, or None while the pool for it is empty"""
+        with self.changed:
+            queue = self.puzzles[difficulty]
+            puzzle = queue.popleft() if queue else None
+            self.changed.notify()
+        return puzzle
+
+    def ready(self, difficulty: str) -> int:
+        with self.changed:
+            return len(self.puzzles[difficulty])
+
+    def _refill(self) -> None:
+        while not self.closed.is_set():
+            with self.changed:
+                missing = [d for d, queue in self.puzzles.items() if len(queue) < self.size]
+                if not missing:
+                    self.changed.wait()
+                    continue
+                difficulty = min(missing, key=lambda d: len(self.puzzles[d]))
+            puzzle = generate_sudoku(difficulty, self.box_size, cancel=self.closed)
+            if puzzle is None:
+                continue
+            with self.changed:
+                self.puzzles[difficulty].append(puzzle)
+
+    def close(self) -> None:
+        self.closed.set()
+        with self.changed:
+            self.changed.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,145 @@
+import time
+from math import isqrt
+
+from arc3 import AC3
+from back_track import undo
+from bit_domains import make_domains
+
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"  # no solution at all
+EXHAUSTED = "exhausted"    # every solution has already been returned
+PAUSED = "paused"          # budget ran out, call run() again to continue
+
+# what run() does next
+_START = 0
+_SELECT = 1
+_ADVANCE = 2
+
+class Search:
+    """MRV + MAC backtracking driven by an explicit stack instead of recursion.
+
+    All state lives on the object, so run() can stop when a node or time
+    budget runs out and pick up where it left off on the next call. Calling
+    run() again after SOLVED continues the search for the next solution.
+    """
+
+    def __init__(self, board: list[int], game_constrains: list[list[int]], engine: AC3 = None, stats=None,
+                 propagator=None, domains=None, changed=None):
+        """`domains` starts from prepared bitmask domains instead of the board's;
+        `changed` limits the initial propagation to those cells (None = all)."""
+        self.game_constrains = game_constrains
+        self.stats = stats
+        if propagator is not None: # AC-3 plus unit techniques, see inference.Propagator
+            self.engine = propagator.engine
+            self.propagate = propagator.propagate
+        else:
+            self.engine = engine if engine is not None else AC3(game_constrains)
+            self.propagate = self.engine.propagate_bits
+        self.size = isqrt(len(board))
+        self.domains = domains if domains is not None else make_domains(board, self.size)
+        self.changed = changed
+        self.trail = []
+        self.stack = []  # (var, values not tried yet, trail mark)
+        self.nodes = 0
+        self.backtracks = 0
+        self.solutions = 0
+        self.status = None
+        self._state = _START
+
+    def select_unassigned_variable(self) -> int:
+        """MRV over the cells whose domain is not a singleton yet"""
+        best_var = -1
+        min_size = self.size + 1
+        domains = self.domains
+
+        for i in range(len(domains)):
+            size = domains[i].bit_count()
+            if 1 < size < min_size:
+                min_size = size
+                best_var = i
+                if size == 2:
+                    break
+        return best_var
+
+    def solution(self) -> list[int]:
+        return [mask.bit_length() for mask in self.domains]
+
+    def partial(self) -> list[int]:
+        """Board of the cells fixed so far, 0 elsewhere"""
+        return [mask.bit_length() if mask & (mask - 1) == 0 else 0 for mask in self.domains]
+
+    def run(self, max_nodes: int = None, time_limit: float = None) -> str:
+        """Search until a solution, exhaustion or the budget; returns the status"""
+        stats = self.stats
+        if stats is None:
+            return self._run(max_nodes, time_limit)
+
+        start = time.perf_counter()
+        try:
+            return self._run(max_nodes, time_limit)
+        finally:
+            stats.nodes = self.nodes
+            stats.backtracks = self.backtracks
+            stats.total_time += time.perf_counter() - start
+
+    def _run(self, max_nodes: int, time_limit: float) -> str:
+        if self.status in (UNSOLVABLE, EXHAUSTED):
+            return self.status
+
+        node_limit = None if max_nodes is None else self.nodes + max_nodes
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+
+        domains = self.domains
+        trail = self.trail
+        stack = self.stack
+        propagate = self.propagate
+        stats = self.stats
+        state = self._state
+
+        if state == _START:
+            # initial AC-3 is never undone, so it does not go on the trail
+            if not propagate(domains, self.changed, None, stats):
+                self.status = UNSOLVABLE
+                return self.status
+            state = _SELECT
+
+        while True:
+            if state == _SELECT:
+                var = self.select_unassigned_variable()
+                if var == -1:
+                    self.solutions += 1
+                    self.status = SOLVED
+                    self._state = _ADVANCE
+                    return self.status
+                stack.append((var, domains[var], len(trail)))
+                if stats is not None and len(stack) > stats.max_depth:
+                    stats.max_depth = len(stack)
+                state = _ADVANCE
+
+            if not stack:
+                self.status = EXHAUSTED if self.solutions else UNSOLVABLE
+                return self.status
+
+            # undone before pausing, so a paused search holds no failed assignment
+            var, remaining, mark = stack[-1]
+            undo(domains, trail, mark)
+
+            if ((node_limit is not None and self.nodes >= node_limit)
+                    or (deadline is not None and time.perf_counter() >= deadline)):
+                self._state = state
+                self.status = PAUSED
+                return self.status
+
+            if not remaining: # every value failed
+                stack.pop()
+                self.backtracks += 1
+                continue
+
+            bit = remaining & -remaining # lowest value first
+            stack[-1] = (var, remaining ^ bit, mark)
+            self.nodes += 1
+
+            trail.append((var, domains[var]))
+            domains[var] = bit
+            if propagate(domains, (var,), trail, stats):
+                state = _SELECT
@@ -0,0 +1,363 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board_io import format_board, parse_board
+from grader import grade
+from solve_puzzle import solve, count_solutions, check_board, SOLVERS, TIMED_OUT, CANCELLED
+from sudoku_generator import generate_sudoku, KEEP_RATIO
+
+MAX_BODY = 1 << 20  # bytes of JSON accepted per request
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+class ServiceBusy(Exception):
+    """Too many requests in flight; the client should retry later"""
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+# Pool jobs. A job carries an absolute wall-clock deadline, passed to the
+# solvers as their cancel flag, so a worker never spends time on a request
+# that has already timed out.
+
+class Deadline:
+    """A cancel flag for the solvers and generator (see solve_puzzle.run_search) that sets itself at a wall-clock time"""
+
+    def __init__(self, at: float):
+        self.at = at
+
+    def is_set(self) -> bool:
+        return time.time() >= self.at
+
+def solve_jobs(jobs: list) -> list:
+    """Solve (board, max_nodes, time_limit, solver, deadline) jobs; returns (status, solution, nodes, seconds)"""
+    results = []
+    for board, max_nodes, time_limit, solver, deadline in jobs:
+        cancel = Deadline(deadline)
+        if cancel.is_set():
+            results.append((TIMED_OUT, None, 0, 0.0))
+            continue
+        result = solve(board, max_nodes, time_limit, solver=solver, cancel=cancel)
+        status = TIMED_OUT if result.status == CANCELLED else result.status
+        results.append((status, result.solution, result.stats.nodes, result.stats.total_time))
+    return results
+
+def validate_jobs(jobs: list) -> list:
+    """Count solutions (up to 2) of (board, deadline) jobs; None when the deadline runs out"""
+    results = []
+    for board, deadline in jobs:
+        cancel = Deadline(deadline)
+        results.append(None if cancel.is_set() else count_solutions(board, limit=2, cancel=cancel))
+    return results
+
+def generate_job(difficulty: str, box_size: int, seed, deadline: float) -> tuple | None:
+    """Generate and grade one puzzle; returns (puzzle, grade label, grade score), None past the deadline"""
+    cancel = Deadline(deadline)
+    random.seed(seed) # None: fresh entropy
+    puzzle = generate_sudoku(difficulty, box_size, cancel=cancel)
+    if puzzle is None:
+        return None
+    puzzle_grade = grade(puzzle, cancel=cancel)
+    return puzzle, puzzle_grade.label, puzzle_grade.score
+
+class Batcher:
+    """Collects jobs for up to `window` seconds or `size` jobs and runs them as one pool task.
+
+    A pool task costs a pickling round trip to a worker, so many small
+    requests arriving together are cheaper sent as one list.
+    """
+
+    def __init__(self, pool, function, size: int, window: float):
+        self.pool = pool
+        self.function = function
+        self.size = size
+        self.window = window
+        self.jobs = []
+        self.futures = []
+        self.timer = None
+        self.batches = 0
+
+    def submit(self, job) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.jobs.append(job)
+        self.futures.append(future)
+        if len(self.jobs) >= self.size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+        return future
+
+    def flush(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.jobs:
+            return
+        jobs, futures = self.jobs, self.futures
+        self.jobs, self.futures = [], []
+        self.batches += 1
+        task = asyncio.get_running_loop().run_in_executor(self.pool, self.function, jobs)
+        task.add_done_callback(lambda done: self._deliver(done, futures))
+
+    @staticmethod
+    def _deliver(done: asyncio.Future, futures: list) -> None:
+        error = asyncio.CancelledError() if done.cancelled() else done.exception()
+        if error is not None:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, result in zip(futures, done.result()):
+            # requests await these futures shielded, so only this callback completes them; still,
+            # one cancelled on shutdown must not keep the rest of the batch from being delivered
+            if not future.done():
+                future.set_result(result)
+
+class SolverService:
+    """Solve, validate and generate on a process pool, so the event loop never blocks.
+
+    At most `max_pending` jobs are queued or running in the pool; beyond
+    that ServiceBusy is raised at once instead of queueing without bound.
+    A job counts until the pool is done with it, even when its request has
+    already timed out. A request's time_limit is the solver's budget
+    (capped at `timeout`); whatever it asks for, a request fails with
+    asyncio.TimeoutError once it has waited `timeout` seconds, and its
+    pool job stops at that deadline too, or is skipped if not started.
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = 256, batch_size: int = 32,
+                 batch_window: float = 0.002, timeout: float = 10.0):
+        # workers start on demand; forked ones would inherit open client sockets
+        # and keep those connections from closing, so they are spawned
+        self.pool = ProcessPoolExecutor(workers or os.cpu_count() or 1, multiprocessing.get_context("spawn"))
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.solver = Batcher(self.pool, solve_jobs, batch_size, batch_window)
+        self.validator = Batcher(self.pool, validate_jobs, batch_size, batch_window)
+        self.pending = 0
+        self.counts = {"requests": 0, "rejected": 0, "timed_out": 0}
+
+    def _time_limit(self, time_limit) -> float:
+        if time_limit is None:
+            return self.timeout
+        if not isinstance(time_limit, (int, float)) or isinstance(time_limit, bool) or time_limit <= 0:
+            raise ValueError("time_limit must be a positive number of seconds")
+        return min(float(time_limit), self.timeout)
+
+    async def _run(self, make_future):
+        if self.pending >= self.max_pending:
+            self.counts["rejected"] += 1
+            raise ServiceBusy()
+        self.pending += 1
+        self.counts["requests"] += 1
+        future = make_future()
+        future.add_done_callback(self._job_done)
+        try:
+            # shielded: a timeout leaves the job running, and counted, until the pool is done with it
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.counts["timed_out"] += 1
+            raise
+
+    def _job_done(self, future: asyncio.Future) -> None:
+        self.pending -= 1
+        if not future.cancelled():
+            future.exception() # retrieved, even when nobody awaits it any more
+
+    async def solve(self, board: list[int], time_limit: float = None, max_nodes: int = None,
+                    solver: str = "csp") -> dict:
+        check_board(board)
+        if solver not in SOLVERS:
+            raise ValueError(f"unknown solver {solver!r}")
+        if max_nodes is not None and (not isinstance(max_nodes, int) or isinstance(max_nodes, bool) or max_nodes <= 0):
+            raise ValueError("max_nodes must be a positive integer")
+        job = (board, max_nodes, self._time_limit(time_limit), solver, time.time() + self.timeout)
+        status, solution, nodes, seconds = await self._run(lambda: self.solver.submit(job))
+        return {
+            "status": status,
+            "solution": None if solution is None else format_board(solution),
+            "nodes": nodes,
+            "ms": round(seconds * 1000, 3),
+        }
+
+    async def validate(self, board: list[int], time_limit: float = None) -> dict:
+        check_board(board)
+        deadline = time.time() + self._time_limit(time_limit)
+        solutions = await self._run(lambda: self.validator.submit((board, deadline)))
+        return {
+            "solutions": solutions, # 0, 1, 2 (= several) or None when undecided in time
+            "unique": solutions == 1 if solutions is not None else None,
+        }
+
+    async def generate(self, difficulty: str = "Medium", box_size: int = 3, seed=None) -> dict:
+        if not isinstance(difficulty, str) or difficulty not in KEEP_RATIO:
+            raise ValueError(f"unknown difficulty {difficulty!r}")
+        if not isinstance(box_size, int) or isinstance(box_size, bool) or box_size not in (2, 3, 4, 5):
+            raise ValueError("box_size must be 2, 3, 4 or 5")
+        if seed is not None and (not isinstance(seed, (int, str)) or isinstance(seed, bool)):
+            raise ValueError("seed must be an integer or a string")
+        loop = asyncio.get_running_loop()
+        deadline = time.time() + self.timeout
+        result = await self._run(
+            lambda: loop.run_in_executor(self.pool, generate_job, difficulty, box_size, seed, deadline))
+        if result is None: # the deadline passed just before the request timed out
+            self.counts["timed_out"] += 1
+            raise asyncio.TimeoutError()
+        puzzle, label, score = result
+        return {"puzzle": format_board(puzzle), "grade": label, "score": score}
+
+    def metrics(self) -> dict:
+        return dict(self.counts, pending=self.pending,
+                    batches=self.solver.batches + self.validator.batches)
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+def _board(body: dict) -> list[int]:
+    puzzle = body.get("puzzle")
+    if isinstance(puzzle, str):
+        return parse_board(puzzle)
+    if isinstance(puzzle, list):
+        return puzzle
+    raise ValueError("'puzzle' must be a puzzle line or a flat list of cell values")
+
+async def dispatch(service: SolverService, method: str, path: str, body: dict) -> dict:
+    if path in ("/health", "/metrics"):
+        if method != "GET":
+            raise HTTPError(405, "use GET")
+        return service.metrics()
+    if path not in ("/solve", "/validate", "/generate"):
+        raise HTTPError(404, f"no endpoint {path}")
+    if method != "POST":
+        raise HTTPError(405, "use POST with a JSON body")
+    if path == "/solve":
+        return await service.solve(_board(body), body.get("time_limit"), body.get("max_nodes"),
+                                   body.get("solver", "csp"))
+    if path == "/validate":
+        return await service.validate(_board(body), body.get("time_limit"))
+    return await service.generate(body.get("difficulty", "Medium"), body.get("box_size", 3), body.get("seed"))
+
+async def read_request(reader: asyncio.StreamReader):
+    """(method, path, headers, body bytes) of the next request, None at end of stream"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = headers.get("content-length") or "0"
+    if not length.isdecimal(): # digits only: int() would also take "-5", " 5" or "1_0"
+        raise HTTPError(400, f"invalid Content-Length {length!r}")
+    length = int(length)
+    if length > MAX_BODY:
+        raise HTTPError(413, f"body over {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split("?")[0], headers, body
+
+def write_response(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool) -> None:
+    data = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+    if status == 503:
+        head += "Retry-After: 1\r\n"
+    writer.write(head.encode() + b"\r\n" + data)
+
+async def handle_connection(service: SolverService, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+    """Serve HTTP/1.1 requests on one connection until the client closes it"""
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    payload = json.loads(body) if body else {}
+                except json.JSONDecodeError as e:
+                    raise HTTPError(400, f"invalid JSON: {e}") from None
+                if not isinstance(payload, dict):
+                    raise HTTPError(400, "the body must be a JSON object")
+                status, response = 200, await dispatch(service, method, path, payload)
+            except HTTPError as e:
+                status, response = e.status, {"error": str(e)}
+            except ValueError as e:
+                status, response = 400, {"error": str(e)}
+            except ServiceBusy:
+                status, response = 503, {"error": "too many requests in flight, retry later"}
+            except asyncio.TimeoutError:
+                status, response = 504, {"error": "request timed out"}
+            except asyncio.IncompleteReadError:
+                break
+            except Exception as e: # a worker crash must not take the server down
+                status, response = 500, {"error": f"{type(e).__name__}: {e}"}
+            write_response(writer, status, response, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def serve(host: str, port: int, service: SolverService) -> None:
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port)
+    address = server.sockets[0].getsockname()
+    print(f"serving on http://{address[0]}:{address[1]}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON solving service: POST /solve, /validate, /generate")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default 8080)")
+    parser.add_argument("-j", "--workers", type=int, default=0, help="worker processes, 0 = one per CPU (default)")
+    parser.add_argument("--max-pending", type=int, default=256, help="requests in flight before answering 503")
+    parser.add_argument("--batch-size", type=int, default=32, help="solve/validate jobs sent to a worker at a time")
+    parser.add_argument("--batch-window", type=float, default=0.002,
+                        help="seconds to wait for more jobs before sending a batch (default 0.002)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="longest time a request may take, in seconds")
+    args = parser.parse_args(argv)
+
+    service = SolverService(args.workers or None, args.max_pending, args.batch_size, args.batch_window, args.timeout)
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
+
+from board_io import format_board, parse_board
+from canonical import apply_transform, canonical_form, invert_transform
+from solve_puzzle import solve, check_board, SolveResult, SOLVED, UNSOLVABLE
+from solver_stats import SolveStats
+
+def canonical_hash(canonical: list[int]) -> str:
+    """Cache key of a canonical board"""
+    return blake2b(format_board(canonical).encode(), digest_size=16).hexdigest()
+
+class SolutionCache:
+    """Solution cache in front of solve_puzzle.solve.
+
+    Two in-memory LRU maps, each holding at most `max_entries`: one keyed by
+    the exact puzzle line, so a repeated puzzle costs a dictionary lookup,
+    and one keyed by the hash of the canonical form, so symmetric copies of a
+    solved puzzle hit too (their solution is mapped back through the
+    transform). With `path`, canonical entries also go to a SQLite file that
+    outlives the process. Only final results (solved / unsolvable) are
+    cached. Safe to share between threads; solving happens outside the lock.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: str = None, commit_every: int = 100):
+        self.max_entries = max_entries
+        self.exact = OrderedDict()      # puzzle line -> (status, solution line, stats dict)
+        self.canonical = OrderedDict()  # canonical hash -> (status, canonical solution line, stats dict)
+        self.lock = threading.Lock()
+        self.hits = 0            # exact puzzle seen before
+        self.canonical_hits = 0  # symmetric copy seen before, in memory
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions "
+                            "(key TEXT PRIMARY KEY, status TEXT, solution TEXT, stats TEXT)")
+            self.commit_every = commit_every
+            self.pending = 0
+
+    def _remember(self, table: OrderedDict, key: str, entry: tuple) -> None:
+        table[key] = entry
+        table.move_to_end(key)
+        if len(table) > self.max_entries:
+            table.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, table: OrderedDict, key: str):
+        entry = table.get(key)
+        if entry is not None:
+            table.move_to_end(key)
+        return entry
+
+    def _load(self, key: str):
+        row = self.db.execute("SELECT status, solution, stats FROM solutions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        status, solution, stats = row
+        return status, solution, json.loads(stats)
+
+    def _store(self, key: str, entry: tuple) -> None:
+        status, solution, stats = entry
+        self.db.execute("INSERT OR REPLACE INTO solutions (key, status, solution, stats) VALUES (?, ?, ?, ?)",
+                        (key, status, solution, json.dumps(stats)))
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.db.commit()
+            self.pending = 0
+
+    def solve(self, board: list[int], **options) -> SolveResult:
+        """solve(board, **options) through the cache; options are those of solve_puzzle.solve.
+
+        A cached result comes back with the stats of the solve that produced it.
+        """
+        check_board(board)
+        line = format_board(board)
+        with self.lock:
+            entry = self._lookup(self.exact, line)
+            if entry is not None:
+                self.hits += 1
+                return _result(entry)
+
+        canonical, transform = canonical_form(board)
+        key = canonical_hash(canonical)
+        with self.lock:
+            found = self._lookup(self.canonical, key)
+            if found is not None:
+                self.canonical_hits += 1
+            elif self.db is not None:
+                found = self._load(key)
+                if found is not None:
+                    self.disk_hits += 1
+                    self._remember(self.canonical, key, found)
+            if found is not None:
+                status, solution, stats = found
+                if solution is not None:
+                    solution = format_board(invert_transform(parse_board(solution), transform))
+                entry = (status, solution, stats)
+                self._remember(self.exact, line, entry)
+                return _result(entry)
+            self.misses += 1
+
+        result = solve(board, **options)
+        if result.status not in (SOLVED, UNSOLVABLE): # timed out: try again next time
+            return result
+
+        stats = result.stats.as_dict()
+        solution = None if result.solution is None else format_board(result.solution)
+        canonical_solution = None
+        if result.solution is not None:
+            canonical_solution = format_board(apply_transform(result.solution, transform))
+        with self.lock:
+            self._remember(self.exact, line, (result.status, solution, stats))
+            self._remember(self.canonical, key, (result.status, canonical_solution, stats))
+            if self.db is not None:
+                self._store(key, (result.status, canonical_solution, stats))
+        return result
+
+    def metrics(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.canonical_hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "canonical_hits": self.canonical_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self.exact),
+                "canonical_entries": len(self.canonical),
+            }
+
+    def flush(self) -> None:
+        """Commit pending disk entries"""
+        if self.db is not None:
+            with self.lock:
+                self.db.commit()
+                self.pending = 0
+
+    def close(self) -> None:
+        if self.db is not None:
+            with self.lock:
+                self.db.commit()
+                self.db.close()
+                self.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def _result(entry: tuple) -> SolveResult:
+    status, solution, stats = entry
+    return SolveResult(status, None if solution is None else parse_board(solution), SolveStats.from_dict(stats))
@@ -1,25 +1,158 @@
-from arc3 import ac3
-from back_track import back_track
+import time
+from typing import NamedTuple
 
-GAME_SIZE = 9
-game_state: list[list[int]] = [[0 for _ in range(GAME_SIZE)] for _ in range(GAME_SIZE)]
-game_constrains: list[list[int]] = [[] for _ in range(GAME_SIZE * GAME_SIZE)]
+from arc3 import AC3
+from dlx import DLX
+from inference import HIDDEN_SINGLES, Propagator
+from make_constrain import box_size_for, constraint_graph
+from search import Search, SOLVED as SEARCH_SOLVED, PAUSED
+from solver_stats import SolveStats
+
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+TIMED_OUT = "timed_out"
+CANCELLED = "cancelled"
+
+# seconds between progress callbacks and cancellation checks
+PROGRESS_INTERVAL = 0.1
+
+# solver engines behind solve(): AC-3 + MAC search, or Dancing Links exact cover
+SOLVERS = ("csp", "dlx")
+
+def default_techniques(box_size: int) -> tuple:
+    """Propagation solve() adds to AC-3 when no techniques are given.
+
+    Hidden singles from 16x16 up: with AC-3 alone, MAC search can guess
+    for minutes on puzzles that hidden singles settle in a fraction of a second.
+    """
+    return (HIDDEN_SINGLES,) if box_size >= 4 else ()
+
+class SolveResult(NamedTuple):
+    status: str                # SOLVED, UNSOLVABLE, TIMED_OUT or CANCELLED
+    solution: list[int] | None # flat solved board when status is SOLVED
+    stats: SolveStats
+
+class SolveProgress(NamedTuple):
+    nodes: int          # search nodes so far
+    depth: int          # current search depth
+    board: list[int]    # cells fixed so far, 0 elsewhere
+    seconds: float      # time since the search started
+
+def run_search(search, max_nodes: int = None, time_limit: float = None, cancel=None, progress=None,
+               interval: float = PROGRESS_INTERVAL) -> str:
+    """Run a Search or DLX within a node and wall-clock budget; returns its status or CANCELLED.
+
+    With `cancel` (anything with is_set(), e.g. a threading.Event) or
+    `progress` (called with a SolveProgress) the search runs in slices of
+    `interval` seconds; between slices cancel is checked and progress
+    reported. Both engines are resumable, so slicing costs nothing else.
+    """
+    if cancel is None and progress is None:
+        return search.run(max_nodes, time_limit)
+    start = time.perf_counter()
+    deadline = None if time_limit is None else start + time_limit
+    node_limit = None if max_nodes is None else search.nodes + max_nodes
+    while True:
+        if cancel is not None and cancel.is_set():
+            return CANCELLED
+        nodes = None if node_limit is None else node_limit - search.nodes
+        remaining = interval if deadline is None else min(interval, deadline - time.perf_counter())
+        status = search.run(nodes, max(remaining, 0))
+        if status != PAUSED:
+            return status
+        if progress is not None:
+            progress(SolveProgress(search.nodes, len(search.stack), search.partial(), time.perf_counter() - start))
+        if ((node_limit is not None and search.nodes >= node_limit)
+                or (deadline is not None and time.perf_counter() >= deadline)):
+            return PAUSED
+
+def check_board(board: list[int]) -> int:
+    """Raise ValueError unless board is a flat N^2 x N^2 grid of values 0..N^2; returns N"""
+    box_size = box_size_for(len(board))
+    size = box_size * box_size
+    for val in board:
+        if not isinstance(val, int) or not 0 <= val <= size:
+            raise ValueError(f"invalid cell value {val!r}")
+    return box_size
+
+def solve(board: list[int], max_nodes: int = None, time_limit: float = None, engine: AC3 = None,
+          techniques=None, solver: str = "csp", cancel=None, progress=None) -> SolveResult:
+    """Solve a flat board (0 = empty) of any N^2 x N^2 grid with AC-3 + MAC search.
+
+    Nothing is shared between calls except the immutable constraint graph, so
+    this is safe to call from several threads or processes at once. `engine`
+    lets a single-threaded caller reuse one AC3 engine across many solves.
+    `techniques` switches on extra propagation (see inference.ALL_TECHNIQUES);
+    None picks default_techniques(), () is AC-3 alone.
+    solver="dlx" runs the Dancing Links engine instead; `max_nodes` then
+    counts rows tried and `engine` / `techniques` do not apply.
+    Setting the `cancel` event stops the search within PROGRESS_INTERVAL
+    with status CANCELLED; `progress` is called with a SolveProgress that often.
+    """
+    box_size = check_board(board)
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}")
+    stats = SolveStats()
+
+    if solver == "dlx":
+        search = DLX(board, stats)
+    else:
+        graph = constraint_graph(box_size)
+        if engine is None:
+            engine = AC3.from_graph(graph)
+        elif len(engine.incoming) != len(board):
+            raise ValueError("engine was built for a different grid size")
+        if techniques is None:
+            techniques = default_techniques(box_size)
+        propagator = Propagator(graph, techniques, engine) if techniques else None
+        search = Search(board, graph.peers, engine, stats, propagator)
+    status = run_search(search, max_nodes, time_limit, cancel, progress)
+
+    if status == SEARCH_SOLVED:
+        return SolveResult(SOLVED, search.solution(), stats)
+    if status == PAUSED:
+        return SolveResult(TIMED_OUT, None, stats)
+    if status == CANCELLED:
+        return SolveResult(CANCELLED, None, stats)
+    return SolveResult(UNSOLVABLE, None, stats)
+
+def count_solutions(board: list[int], limit: int = 2, max_nodes: int = None, time_limit: float = None,
+                    solver: str = "dlx", cancel=None) -> int | None:
+    """Count the solutions of a board, stopping as soon as `limit` are found.
+
+    limit=2 is the uniqueness check: 0 means unsolvable, 1 unique and 2 more
+    than one. Returns None if the node or time budget runs out first, or
+    the `cancel` event is set.
+    """
+    box_size = check_board(board)
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}")
+    if solver == "dlx":
+        search = DLX(board)
+    else:
+        graph = constraint_graph(box_size)
+        search = Search(board, graph.peers, AC3.from_graph(graph))
+
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    while search.solutions < limit:
+        nodes = None if max_nodes is None else max_nodes - search.nodes
+        remaining = None if deadline is None else deadline - time.perf_counter()
+        status = run_search(search, nodes, remaining, cancel)
+        if status in (PAUSED, CANCELLED):
+            return None
+        if status != SEARCH_SOLVED:
+            break
+    return search.solutions
 
 def solve_puzzle(initial_board):
-    # Setup domains
-    domains = []
-    for val in initial_board:
-        if val != 0:
-            domains.append({val})
-        else:
-            domains.append(set(range(1, 10)))
-            
-    if not ac3(game_constrains, domains):
-        print("Unsolvable detected by initial AC-3")
-        return
+    """Solve in place and print the outcome; returns the SolveResult"""
+    result = solve(initial_board)
 
-    if back_track(initial_board, domains, game_constrains):
+    if result.status == SOLVED:
+        initial_board[:] = result.solution
         print("Solved!")
-        # Print 'initial_board' which now contains the solution
+    elif result.stats.nodes == 0:
+        print("Unsolvable detected by initial AC-3")
     else:
-        print("No solution found.")
\ No newline at end of file
+        print("No solution found.")
+    return result
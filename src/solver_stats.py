@@ -0,0 +1,49 @@
+class SolveStats:
+    """Counters collected while solving one puzzle.
+
+    Pass an instance as `stats` to revise, back_track, the AC3 engine or
+    Search to fill it in; with the default None nothing is counted.
+    """
+
+    __slots__ = ("nodes", "backtracks", "arcs", "pruned", "depth", "max_depth",
+                 "propagation_time", "total_time")
+
+    def __init__(self):
+        self.nodes = 0               # values tried
+        self.backtracks = 0          # variables whose values all failed
+        self.arcs = 0                # arcs taken off the AC-3 queue
+        self.pruned = 0              # values removed from domains
+        self.depth = 0               # current search depth
+        self.max_depth = 0
+        self.propagation_time = 0.0  # seconds inside AC-3
+        self.total_time = 0.0        # seconds of the whole solve, set by the caller
+
+    @property
+    def search_time(self) -> float:
+        return max(0.0, self.total_time - self.propagation_time)
+
+    def as_dict(self) -> dict:
+        return {
+            "nodes": self.nodes,
+            "backtracks": self.backtracks,
+            "arcs": self.arcs,
+            "pruned": self.pruned,
+            "max_depth": self.max_depth,
+            "propagation_time": self.propagation_time,
+            "search_time": self.search_time,
+            "total_time": self.total_time,
+        }
+
+    @classmethod
+    def from_dict(cls, counters: dict) -> "SolveStats":
+        """Inverse of as_dict (the derived search_time is ignored)"""
+        stats = cls()
+        for name in cls.__slots__:
+            if name in counters:
+                setattr(stats, name, counters[name])
+        return stats
+
+    def __str__(self) -> str:
+        return (f"{self.nodes} nodes, {self.backtracks} backtracks, depth {self.max_depth}, "
+                f"{self.arcs} arcs, {self.pruned} pruned, "
+                f"AC-3 {self.propagation_time * 1000:.1f} ms / search {self.search_time * 1000:.1f} ms")
@@ -1,99 +1,237 @@
 import random
-import copy
-from back_track import back_track
-from make_constrain import make_constrain
-from arc3 import ac3
+from array import array
+from typing import NamedTuple
+from arc3 import AC3
+from bit_domains import make_domains
+from make_constrain import box_size_for, constraint_graph
+from inference import HIDDEN_SINGLES, Propagator
+from search import Search, SOLVED, UNSOLVABLE
+from solve_puzzle import count_solutions, run_search, CANCELLED
 
-GAME_SIZE = 9
+BOX_SIZE = 3
+
+# share of the cells kept as givens for each difficulty (42, 36 and 32 on a 9x9 board)
+KEEP_RATIO = {
+    "Easy": 42 / 81,
+    "Medium": 36 / 81,
+    "Hard": 32 / 81,
+}
+
+# node budget for completing the diagonal-box grid before trying another fill
+FILL_NODE_BUDGET = 10000
+
+# node budget of one uniqueness check on a 9x9 grid while digging; a removal
+# that cannot be decided within it is undone, which keeps large grids from stalling
+UNIQUE_NODE_BUDGET = 5000
+
+class GenerationProgress(NamedTuple):
+    attempt: int   # 1-based attempt of generate_sudoku
+    clues: int     # givens left on the board
+    target: int    # givens the difficulty aims for
+
+class DigHoleGenerator:
+    """Removes clues from a solved grid one at a time, keeping the solution unique.
+
+    Removing clue p keeps the puzzle unique exactly when no solution puts
+    another value at p, so a trial is a single search with p's solution value
+    taken out. For every cell it keeps how many given peers hold each value:
+    a removal only updates the peers of the removed clue, the trial domains
+    are a copy of the maintained ones, and propagation starts from the empty
+    cells rather than from every given. A rejected clue stays rejected for
+    any smaller puzzle, so each cell is tried at most once.
+    """
+
+    def __init__(self, solution: list[int], graph, max_nodes: int = UNIQUE_NODE_BUDGET):
+        self.solution = list(solution)
+        self.puzzle = list(solution)
+        self.peers = graph.peers
+        self.size = graph.size
+        # nodes get dearer with the grid: scale the 9x9 budget down by cells^2
+        self.max_nodes = max(1, max_nodes * 81 * 81 // len(solution) ** 2)
+        self.engine = AC3.from_graph(graph)
+        # hidden singles settle most trials without search on larger grids
+        self.propagator = Propagator(graph, (HIDDEN_SINGLES,), self.engine)
+        self.full = (1 << graph.size) - 1
+        self.empty = []
+        # support[cell * size + v - 1]: given peers of cell holding value v
+        self.support = [0] * (len(solution) * graph.size)
+        for cell, pos_peers in enumerate(self.peers):
+            base = cell * graph.size - 1
+            for peer in pos_peers:
+                self.support[base + solution[peer]] += 1
+        self.domains = make_domains(solution, graph.size)
+
+    def remove(self, pos: int) -> None:
+        """Empty cell pos without any check"""
+        val = self.puzzle[pos]
+        self.puzzle[pos] = 0
+        self.empty.append(pos)
+        size = self.size
+        support = self.support
+        domains = self.domains
+        bit = 1 << (val - 1)
+        for peer in self.peers[pos]:
+            idx = peer * size + val - 1
+            support[idx] -= 1
+            if support[idx] == 0 and self.puzzle[peer] == 0:
+                domains[peer] |= bit
+        domains[pos] = self.full & ~self.blocked(pos)
+
+    def restore(self, pos: int) -> None:
+        """Put the clue at pos back, undoing remove(pos)"""
+        val = self.solution[pos]
+        self.puzzle[pos] = val
+        self.empty.remove(pos)
+        size = self.size
+        support = self.support
+        domains = self.domains
+        bit = 1 << (val - 1)
+        for peer in self.peers[pos]:
+            idx = peer * size + val - 1
+            support[idx] += 1
+            if support[idx] == 1 and self.puzzle[peer] == 0:
+                domains[peer] &= ~bit
+        domains[pos] = bit
+
+    def blocked(self, pos: int) -> int:
+        """Values held by the given peers of pos"""
+        support = self.support
+        base = pos * self.size
+        mask = 0
+        for v in range(self.size):
+            if support[base + v]:
+                mask |= 1 << v
+        return mask
+
+    def try_remove(self, pos: int) -> bool:
+        """Remove the clue at pos if the solution stays unique; returns whether it did"""
+        self.remove(pos)
+        others = self.domains[pos] & ~(1 << (self.solution[pos] - 1))
+        if others:
+            domains = array(self.domains.typecode, self.domains)
+            domains[pos] = others
+            search = Search(self.puzzle, self.peers, self.engine, propagator=self.propagator,
+                            domains=domains, changed=self.empty)
+            if search.run(max_nodes=self.max_nodes) != UNSOLVABLE:
+                self.restore(pos) # another solution, or undecided within the budget
+                return False
+        return True
 
 def get_difficulty(board: list[int]) -> str:
    
     givens = sum(1 for x in board if x != 0)
-    if givens >= 40:
+    cells = len(board)
+    # 40 and 32 givens on a 9x9 board, scaled to the grid size
+    if givens * 81 >= 40 * cells:
         return "Easy"
-    elif givens >= 32:
+    elif givens * 81 >= 32 * cells:
         return "Medium"
     else:
         return "Hard"
 
-def fill_box(board: list[int], row_start: int, col_start: int):
-    """Fill a 3x3 box with random values 1-9"""
-    nums = list(range(1, 10))
+def clue_target(difficulty: str, cells: int) -> int:
+    """Givens generate_sudoku aims to keep for a difficulty on a board of `cells` cells"""
+    return round(KEEP_RATIO.get(difficulty, KEEP_RATIO["Hard"]) * cells)
+
+def fill_box(board: list[int], row_start: int, col_start: int, box_size: int = BOX_SIZE):
+    """Fill a box_size x box_size box with random values 1..box_size^2"""
+    size = box_size * box_size
+    nums = list(range(1, size + 1))
     random.shuffle(nums)
-    for i in range(3):
-        for j in range(3):
-            board[(row_start + i) * 9 + (col_start + j)] = nums.pop()
+    for i in range(box_size):
+        for j in range(box_size):
+            board[(row_start + i) * size + (col_start + j)] = nums.pop()
 
 def has_unique_solution_ac3(board: list[int]) -> bool:
     """Check if board has unique solution using AC-3 only"""
-    game_constrains = [[] for _ in range(81)]
-    make_constrain(game_constrains)
+    box_size = box_size_for(len(board))
+    engine = AC3.from_graph(constraint_graph(box_size))
     
     # Setup domains
-    domains = []
-    for val in board:
-        if val != 0:
-            domains.append({val})
-        else:
-            domains.append(set(range(1, 10)))
+    domains = make_domains(board, box_size * box_size)
     
     # Apply AC-3
-    if not ac3(game_constrains, domains):
+    if not engine.propagate_bits(domains):
         return False
     
     # Check if all domains reduced to single values (unique solution)
-    return all(len(d) == 1 for d in domains)
+    return all(d & (d - 1) == 0 for d in domains)
+
+def has_unique_solution(board: list[int], max_nodes: int = None) -> bool:
+    """Exact uniqueness check: count solutions, stopping at the second one.
+
+    False if `max_nodes` runs out before the count is known.
+    """
+    return count_solutions(board, limit=2, max_nodes=max_nodes) == 1
 
-def generate_sudoku(difficulty: str = "Medium") -> list[int]:
-    """Generate a Sudoku puzzle with unique solution verifiable by AC-3"""
+def generate_sudoku(difficulty: str = "Medium", box_size: int = BOX_SIZE, exact: bool = True,
+                    cancel=None, progress=None) -> list[int] | None:
+    """Generate a Sudoku puzzle with a unique solution.
+
+    With `exact` every removal is proven to keep the solution unique (see
+    DigHoleGenerator); otherwise the puzzle must stay solvable by AC-3 alone
+    (fewer, easier puzzles). `progress` is called with a GenerationProgress
+    a few dozen times per attempt; once the `cancel` event is set the
+    generator stops and returns None.
+    """
     max_attempts = 50  # Reduced from 100 to prevent long hangs
+    size = box_size * box_size
+    cells = size * size
     
     for attempt in range(max_attempts):
+        if cancel is not None and cancel.is_set():
+            return None
         try:
-            board = [0] * 81
+            board = [0] * cells
             
             # Fill diagonal boxes
-            for i in range(0, 9, 3):
-                fill_box(board, i, i)
+            for i in range(0, size, box_size):
+                fill_box(board, i, i, box_size)
 
-            game_constrains = [[] for _ in range(81)]
-            make_constrain(game_constrains)
-            
-            domains = [set(range(1, 10)) for _ in range(81)]
-            for i in range(81):
-                if board[i] != 0:
-                    domains[i] = {board[i]}
+            graph = constraint_graph(box_size)
             
             # Solve the complete board
-            if not back_track(board, domains, game_constrains):
+            search = Search(board, graph.peers, AC3.from_graph(graph))
+            status = run_search(search, FILL_NODE_BUDGET, cancel=cancel)
+            if status == CANCELLED:
+                return None
+            if status != SOLVED:
                 continue
+            board = search.solution()
             
             # Determine number of cells to keep based on difficulty
             # More clues = easier = unique solution by AC-3
-            if difficulty == "Easy":
-                cells_to_keep = 42  # Keep more clues
-            elif difficulty == "Medium":
-                cells_to_keep = 36  # Keep moderate clues
-            else:  # Hard
-                cells_to_keep = 32  # Keep fewer clues but still AC-3 solvable
+            cells_to_keep = clue_target(difficulty, cells)
             
             # Try to create puzzle by removing cells
-            filled_positions = [i for i in range(81)]
+            filled_positions = [i for i in range(cells)]
             random.shuffle(filled_positions)
             
             puzzle = board.copy()
+            digger = DigHoleGenerator(board, graph) if exact else None
             removed_count = 0
-            target_removals = 81 - cells_to_keep
+            target_removals = cells - cells_to_keep
             
             # Limit checks to prevent infinite loops
-            max_checks = min(81, target_removals + 10)
+            max_checks = min(cells, target_removals + 10)
             checks = 0
+            report_every = max(1, max_checks // 20)
             
             for pos in filled_positions:
                 if removed_count >= target_removals or checks >= max_checks:
                     break
+                # a trial can take a tenth of a second on 25x25, so cancel is checked before each
+                if cancel is not None and cancel.is_set():
+                    return None
+                if progress is not None and checks % report_every == 0:
+                    progress(GenerationProgress(attempt + 1, cells - removed_count, cells_to_keep))
                 
                 checks += 1
+
+                if exact:
+                    if digger.try_remove(pos):
+                        removed_count += 1
+                    continue
                 
                 # Try removing this cell
                 backup = puzzle[pos]
@@ -106,10 +244,13 @@ def generate_sudoku(difficulty: str = "Medium") -> list[int]:
                     # Restore the cell
                     puzzle[pos] = backup
             
-            # Verify final puzzle has unique solution by AC-3
-            if has_unique_solution_ac3(puzzle):
+            if exact:
+                puzzle = digger.puzzle
+
+            # Verify final puzzle has unique solution (each exact removal already is)
+            if exact or has_unique_solution_ac3(puzzle):
                 # Clear references to help garbage collection
-                del board, domains, game_constrains
+                del board, search
                 return puzzle
                 
         except Exception as e:
@@ -117,10 +258,10 @@ def generate_sudoku(difficulty: str = "Medium") -> list[int]:
             continue
     
     # If we couldn't generate a valid puzzle, return a simpler fallback
-    print(f"Warning: Could not generate {difficulty} puzzle with AC-3 unique solution after {max_attempts} attempts")
+    print(f"Warning: Could not generate {difficulty} puzzle with unique solution after {max_attempts} attempts")
     # Return the last attempt if it exists
     if 'puzzle' in locals():
         return puzzle
     else:
         # Return empty board as last resort
-        return [0] * 81
+        return [0] * cells
@@ -0,0 +1,39 @@
+import pytest
+
+from bulk_generate import QuotaError, generate_bulk
+from grader import grade
+from solve_puzzle import count_solutions
+
+QUOTAS = {"Easy": 3, "Medium": 2}
+
+def run(workers: int) -> tuple[list, dict]:
+    stats = {}
+    return list(generate_bulk(QUOTAS, workers, seed=7, stats=stats)), stats
+
+def test_quotas_are_filled_with_graded_unique_puzzles():
+    puzzles, stats = run(1)
+    counts = {}
+    for difficulty, puzzle in puzzles:
+        counts[difficulty] = counts.get(difficulty, 0) + 1
+        assert grade(puzzle).label == difficulty
+        assert count_solutions(puzzle) == 1
+    assert counts == QUOTAS
+    assert stats["tasks"] - stats["rejected"] - stats["duplicate"] >= sum(QUOTAS.values())
+
+def test_parallel_output_matches_serial():
+    serial, _ = run(1)
+    parallel, _ = run(4)
+    assert sorted(parallel) == sorted(serial)
+    for difficulty in QUOTAS:
+        assert ([p for d, p in parallel if d == difficulty]
+                == [p for d, p in serial if d == difficulty])
+
+def test_unreachable_label_is_rejected_up_front():
+    with pytest.raises(ValueError):
+        next(generate_bulk({"Medium": 1}, box_size=2))
+
+def test_quota_gives_up_after_its_attempt_budget():
+    stats = {}
+    with pytest.raises(QuotaError):
+        list(generate_bulk({"Hard": 5}, seed=7, stats=stats, attempts=1))
+    assert stats["tasks"] == 5
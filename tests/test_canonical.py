@@ -0,0 +1,61 @@
+import random
+import time
+
+import pytest
+
+from canonical import DedupIndex, Transform, apply_transform, canonical_form, invert_transform
+from solve_puzzle import solve
+from sudoku_generator import generate_sudoku
+
+def random_symmetry(rng: random.Random, box_size: int) -> Transform:
+    """A random transposition, band / stack order, line order within them and relabelling"""
+    def lines():
+        bands = rng.sample(range(box_size), box_size)
+        return tuple(band * box_size + i for band in bands for i in rng.sample(range(box_size), box_size))
+    size = box_size * box_size
+    relabel = (0,) + tuple(rng.sample(range(1, size + 1), size))
+    return Transform(rng.random() < 0.5, lines(), lines(), relabel)
+
+@pytest.fixture(scope="module")
+def puzzles():
+    random.seed(11)
+    return [generate_sudoku(difficulty, box_size)
+            for box_size in (2, 3) for difficulty in ("Easy", "Hard") for _ in range(3)]
+
+def test_canonical_form_is_invariant_under_symmetries(puzzles):
+    rng = random.Random(5)
+    for puzzle in puzzles:
+        box_size = 2 if len(puzzle) == 16 else 3
+        canonical = canonical_form(puzzle)[0]
+        for _ in range(5):
+            copy = apply_transform(puzzle, random_symmetry(rng, box_size))
+            assert canonical_form(copy)[0] == canonical
+
+def test_transforms_round_trip(puzzles):
+    rng = random.Random(6)
+    for puzzle in puzzles:
+        canonical, transform = canonical_form(puzzle)
+        assert apply_transform(puzzle, transform) == canonical
+        assert invert_transform(canonical, transform) == puzzle
+        symmetry = random_symmetry(rng, 2 if len(puzzle) == 16 else 3)
+        assert invert_transform(apply_transform(puzzle, symmetry), symmetry) == puzzle
+
+def test_dedup_index_spots_transformed_duplicates(puzzles, tmp_path):
+    rng = random.Random(7)
+    puzzle = puzzles[-1]
+    with DedupIndex(str(tmp_path / "seen.db")) as index:
+        assert index.add(puzzle)
+        copy = apply_transform(puzzle, random_symmetry(rng, 3))
+        assert copy in index
+        assert not index.add(copy)
+        assert index.add(puzzles[-2])
+        assert len(index) == 2
+
+def test_solved_16x16_grid_stays_within_budget():
+    grid = solve([0] * 256).solution
+    start = time.perf_counter()
+    canonical, transform = canonical_form(grid)
+    assert time.perf_counter() - start < 5
+    # out of budget: the grid itself, with a transform that still round-trips
+    assert apply_transform(grid, transform) == canonical
+    assert invert_transform(canonical, transform) == grid
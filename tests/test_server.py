@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+from server import SolverService, solve_jobs
+from solve_puzzle import SOLVED, TIMED_OUT
+
+EMPTY_25 = [0] * 625
+
+def test_solve_job_stops_at_its_deadline():
+    start = time.perf_counter()
+    [(status, solution, _, _)] = solve_jobs([(EMPTY_25, None, 60.0, "csp", time.time() + 0.05)])
+    assert status == TIMED_OUT and solution is None
+    assert time.perf_counter() - start < 1
+
+def test_timed_out_request_frees_its_pool_slot():
+    async def scenario():
+        service = SolverService(workers=1, timeout=0.2)
+        try:
+            # start the worker first, so the deadline falls inside the 25x25 solve
+            service.timeout = 30
+            assert (await service.solve([0] * 81))["status"] == SOLVED
+            service.timeout = 0.2
+
+            with pytest.raises(asyncio.TimeoutError):
+                await service.solve(EMPTY_25)
+            assert service.metrics()["timed_out"] == 1
+
+            # solving the empty 25x25 board takes about half a second more, so a slot
+            # freed this soon means the deadline stopped the job
+            freed_by = time.perf_counter() + 0.3
+            while service.pending and time.perf_counter() < freed_by:
+                await asyncio.sleep(0.01)
+            assert service.pending == 0
+
+            service.timeout = 30
+            assert (await service.solve([0] * 81))["status"] == SOLVED
+        finally:
+            service.close()
+
+    asyncio.run(scenario())